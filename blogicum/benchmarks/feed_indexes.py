@@ -0,0 +1,171 @@
+"""Замер запросов лент до и после индексов из миграции 0003.
+
+Скрипт создаёт временную SQLite-базу, применяет миграции blog до 0002,
+заполняет её постами и комментариями, замеряет запросы главной ленты,
+ленты категории, профиля и комментариев, затем применяет 0003 и
+повторяет замер.
+
+Запуск из каталога blogicum/:
+    python benchmarks/feed_indexes.py --posts 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+BATCH = 50_000
+
+
+def seed(posts, comments, users=1_000, categories=50, locations=100):
+    """Заполнение базы сырыми INSERT-ами (ORM здесь слишком медленный)."""
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    rnd = random.Random(0)
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (id, password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, '
+            "date_joined) VALUES (%s, '', 0, %s, '', '', '', 0, 1, %s)",
+            [(i, f'user{i}', now) for i in range(1, users + 1)],
+        )
+        cursor.executemany(
+            'INSERT INTO blog_category (id, is_published, created_at, '
+            'title, description, slug) VALUES (%s, %s, %s, %s, %s, %s)',
+            [
+                (i, i % 10 != 0, now, f'Категория {i}', '', f'cat-{i}')
+                for i in range(1, categories + 1)
+            ],
+        )
+        cursor.executemany(
+            'INSERT INTO blog_location (id, is_published, created_at, name) '
+            'VALUES (%s, 1, %s, %s)',
+            [(i, now, f'Место {i}') for i in range(1, locations + 1)],
+        )
+        for start in range(1, posts + 1, BATCH):
+            cursor.executemany(
+                'INSERT INTO blog_post (id, is_published, created_at, '
+                'title, text, pub_date, author_id, location_id, '
+                'category_id, image, comment_count) '
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, '', 0)",
+                [
+                    (
+                        i,
+                        rnd.random() < 0.95,
+                        now,
+                        f'Пост {i}',
+                        'Текст поста ' * 20,
+                        now - timedelta(minutes=rnd.randrange(5 * 525_600)),
+                        rnd.randint(1, users),
+                        rnd.randint(1, locations),
+                        rnd.randint(1, categories),
+                    )
+                    for i in range(start, min(start + BATCH, posts + 1))
+                ],
+            )
+        for start in range(1, comments + 1, BATCH):
+            cursor.executemany(
+                'INSERT INTO blog_comment (id, text, post_id, created_at, '
+                'author_id) VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (
+                        i,
+                        'Комментарий',
+                        rnd.randint(1, posts),
+                        now - timedelta(minutes=rnd.randrange(525_600)),
+                        rnd.randint(1, users),
+                    )
+                    for i in range(start, min(start + BATCH, comments + 1))
+                ],
+            )
+
+
+# Колонки постов, которые есть уже в схеме 0002: поля, добавленные
+# позже (excerpt, category_published), в этой базе ещё не созданы.
+POST_COLUMNS = (
+    'id', 'title', 'text', 'pub_date', 'image', 'comment_count',
+    'author__username', 'category__slug', 'category__title',
+    'location__name', 'location__is_published',
+)
+
+
+def workload():
+    """Запросы лент в том виде, в каком их строили представления до 0003.
+
+    Используется values() по колонкам схемы 0002, а условие публикации
+    записано явно, без PostQuerySet.published(), который теперь читает
+    category_published.
+    """
+    from blog.models import Comment, Post, published_until
+
+    posts = Post.objects.order_by('-pub_date', '-id').values(*POST_COLUMNS)
+    feed = posts.filter(
+        is_published=True,
+        category__is_published=True,
+        pub_date__lt=published_until(),
+    )
+    return {
+        'Главная, стр. 1': lambda: list(feed[:10]),
+        'Главная, стр. 500': lambda: list(feed[4990:5000]),
+        'Категория, стр. 1': lambda: list(feed.filter(category_id=7)[:10]),
+        'Профиль, стр. 1': lambda: list(posts.filter(author_id=42)[:10]),
+        'Комментарии поста': lambda: list(
+            Comment.objects.filter(post_id=777).values(
+                'id', 'text', 'created_at', 'author__username'
+            )
+        ),
+    }
+
+
+def measure(repeat):
+    """Медиана времени каждого запроса в миллисекундах."""
+    results = {}
+    for name, query in workload().items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    """Точка входа."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--comments', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES['default']['NAME'] = Path(tmp) / 'bench.sqlite3'
+        django.setup()
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('migrate', 'blog', '0002', verbosity=0)
+        seed(args.posts, args.comments)
+        before = measure(args.repeat)
+        call_command('migrate', 'blog', '0003', verbosity=0)
+        after = measure(args.repeat)
+
+    print(f'{"Запрос":<22}{"до, мс":>12}{"после, мс":>12}')
+    for name in before:
+        print(f'{name:<22}{before[name]:>12.2f}{after[name]:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
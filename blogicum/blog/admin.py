@@ -63,3 +63,8 @@ class CommentAdmin(admin.ModelAdmin):
     """Класс комментария."""
 
     list_display = ["post", "author", "created_at", "short_text"]
+
+    @admin.display(description='Текст')
+    def short_text(self, obj):
+        """Сокращённый текст комментария."""
+        return str(obj)
@@ -0,0 +1,359 @@
+from http import HTTPStatus
+
+from blog.cache import INDEX_TAG, category_tag, post_tag, profile_tag
+from blog.constants import (API_BATCH_LIMIT, COMMENTS_ORDERING,
+                            COMMENTS_PAGE_SIZE, DB_INTEGER_RANGE,
+                            MAX_POSTS_PAGE)
+from blog.mixins import ConditionalGetMixin, ScheduledPublicationMixin
+from blog.models import Category, Comment, FeedEntry, Post, User
+from blog.paginators import CursorPaginator
+
+from django.http import Http404, JsonResponse
+from django.utils.functional import cached_property
+from django.views.generic import View
+
+
+class ApiError(Exception):
+    """Неверные параметры запроса к API (ответ 400)."""
+
+
+class ValuesSerializer:
+    """Сериализация строк values() без создания объектов моделей.
+
+    `fields` сопоставляет имя поля ответа с колонкой queryset или
+    кортежем колонок; значение (кортеж значений) можно преобразовать
+    методом `convert_<имя>`. Параметр `?fields=` выбирает подмножество
+    полей, и из БД читаются только их колонки.
+    """
+
+    fields = {}
+    default_fields = None
+
+    def __init__(self, requested=None, default_fields=None):
+        if requested is None:
+            names = default_fields or self.default_fields or self.fields
+        else:
+            names = [
+                name.strip() for name in requested.split(',') if name.strip()
+            ]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown or not names:
+                raise ApiError(
+                    'Неизвестные поля: {}. Доступны: {}.'.format(
+                        ', '.join(unknown) or '—', ', '.join(self.fields)
+                    )
+                )
+        self.names = tuple(dict.fromkeys(names))
+
+    def columns(self, *extra):
+        """Колонки выбранных полей и служебные колонки `extra`."""
+        columns = []
+        for name in self.names:
+            source = self.fields[name]
+            columns.extend(source if isinstance(source, tuple) else [source])
+        return tuple(dict.fromkeys(columns + list(extra)))
+
+    def values(self, queryset, *extra):
+        """Queryset словарей только с нужными колонками."""
+        return queryset.values(*self.columns(*extra))
+
+    def serialize(self, row):
+        """Словарь ответа из строки values()."""
+        data = {}
+        for name in self.names:
+            source = self.fields[name]
+            if isinstance(source, tuple):
+                value = tuple(row[column] for column in source)
+            else:
+                value = row[source]
+            convert = getattr(self, f'convert_{name}', None)
+            data[name] = value if convert is None else convert(value)
+        return data
+
+
+class PostSerializer(ValuesSerializer):
+    """Поля поста.
+
+    Категория берётся из снимка маленького справочника категорий, а
+    местоположение — соединением по ключу: таблица мест велика, чтобы
+    держать её в памяти каждого процесса.
+    """
+
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'text': 'text',
+        'excerpt': 'excerpt',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'category': 'category_id',
+        'location': ('location__name', 'location__is_published'),
+        'image': 'image',
+        'comment_count': 'comment_count',
+    }
+    # в лентах текст заменяет анонс, как в карточках постов
+    default_fields = tuple(name for name in fields if name != 'text')
+
+    @cached_property
+    def categories(self):
+        """Снимок категорий на время ответа."""
+        return Category.objects.snapshot()
+
+    def convert_category(self, pk):
+        """Категория поста: slug и название."""
+        category = self.categories.get(pk)
+        if category is None:
+            return None
+        return {'slug': category.slug, 'title': category.title}
+
+    def convert_location(self, value):
+        """Название места, если оно опубликовано."""
+        name, is_published = value
+        return name if is_published else None
+
+    def convert_image(self, name):
+        """Адрес изображения."""
+        if not name:
+            return None
+        return Post._meta.get_field('image').storage.url(name)
+
+
+class CommentSerializer(ValuesSerializer):
+    """Поля комментария."""
+
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'created_at': 'created_at',
+        'author': 'author__username',
+    }
+
+
+class ApiView(ScheduledPublicationMixin, ConditionalGetMixin, View):
+    """Базовое представление JSON API только для чтения.
+
+    Ответы получают ETag и Last-Modified по тегам страниц (см.
+    ConditionalGetMixin), ошибки отдаются в JSON вида {"error": ...}.
+    """
+
+    serializer_class = None
+    default_fields = None
+
+    def dispatch(self, request, *args, **kwargs):
+        """Ошибки параметров и 404 в JSON."""
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {'error': str(error)}, status=HTTPStatus.BAD_REQUEST
+            )
+        except Http404:
+            return JsonResponse(
+                {'error': 'Не найдено.'}, status=HTTPStatus.NOT_FOUND
+            )
+
+    @cached_property
+    def serializer(self):
+        """Сериализатор с полями из `?fields=`."""
+        return self.serializer_class(
+            self.request.GET.get('fields'), self.default_fields
+        )
+
+    def get(self, request, *args, **kwargs):
+        """JSON с данными представления."""
+        return JsonResponse(self.get_data())
+
+    def get_data(self):
+        """Данные ответа."""
+        raise NotImplementedError
+
+    def paginate(self, queryset, page_size, ordering):
+        """Страница по курсору `?after=`/`?before=`."""
+        page = CursorPaginator(queryset, page_size, ordering).page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return page, {
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+
+class PostFeedApiView(ApiView):
+    """Лента опубликованных постов.
+
+    Страница выбирается по FeedEntry, как в BaseMixin, затем посты
+    читаются одним запросом по первичному ключу.
+    """
+
+    serializer_class = PostSerializer
+    query_budget = 4
+
+    def get_entries(self):
+        """Записи ленты."""
+        return FeedEntry.objects.published()
+
+    def get_data(self):
+        """Страница ленты."""
+        page, links = self.paginate(
+            self.get_entries().values('post_id', 'pub_date'),
+            MAX_POSTS_PAGE,
+            ('-pub_date', '-post_id'),
+        )
+        ids = [entry['post_id'] for entry in page]
+        return {'results': self.get_posts(ids), **links}
+
+    def get_posts(self, ids, queryset=None):
+        """Посты в порядке `ids`; недоступные пропускаются."""
+        if queryset is None:
+            queryset = Post.objects.all()
+        rows = {
+            row['id']: row
+            for row in self.serializer.values(
+                queryset.filter(pk__in=ids), 'id'
+            )
+        }
+        return [
+            self.serializer.serialize(rows[pk]) for pk in ids if pk in rows
+        ]
+
+
+class IndexApiView(PostFeedApiView):
+    """Главная лента и выборка постов по `?ids=`."""
+
+    @cached_property
+    def ids(self):
+        """Идентификаторы из `?ids=1,2,3` или None."""
+        raw = self.request.GET.get('ids')
+        if raw is None:
+            return None
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in raw.split(',')))
+        except ValueError:
+            raise ApiError('ids — список целых чисел через запятую.')
+        if any(pk not in DB_INTEGER_RANGE for pk in ids):
+            raise ApiError('ids вне диапазона целых чисел БД.')
+        if len(ids) > API_BATCH_LIMIT:
+            raise ApiError(
+                f'Не больше {API_BATCH_LIMIT} постов за один запрос.'
+            )
+        return ids
+
+    def get_validator_tags(self):
+        """Лента зависит от всех постов, выборка — от своих."""
+        if self.ids is None:
+            return {INDEX_TAG}
+        return {post_tag(pk) for pk in self.ids} or {INDEX_TAG}
+
+    def get_data(self):
+        """Страница ленты или посты из `?ids=`, видимые пользователю."""
+        if self.ids is None:
+            return super().get_data()
+        return {
+            'results': self.get_posts(
+                self.ids, Post.objects.visible_to(self.request.user)
+            ),
+        }
+
+
+class CategoryApiView(PostFeedApiView):
+    """Лента опубликованной категории."""
+
+    def get_validator_tags(self):
+        """Посты категории."""
+        return {category_tag(self.kwargs['category_slug'])}
+
+    def get_entries(self):
+        """Записи ленты категории из снимка справочника."""
+        category = Category.objects.snapshot().by_slug.get(
+            self.kwargs['category_slug']
+        )
+        if category is None or not category.is_published:
+            raise Http404('Категория не найдена.')
+        return super().get_entries().filter(category=category)
+
+
+class ProfileApiView(ApiView):
+    """Посты автора: все для самого автора, опубликованные для других."""
+
+    serializer_class = PostSerializer
+    query_budget = 4
+
+    def get_validator_tags(self):
+        """Данные и посты автора."""
+        return {profile_tag(self.kwargs['username'])}
+
+    def get_data(self):
+        """Страница постов автора."""
+        author_id = (
+            User.objects.filter(username=self.kwargs['username'])
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if author_id is None:
+            raise Http404('Пользователь не найден.')
+        posts = Post.objects.filter(author_id=author_id)
+        if self.request.user.pk != author_id:
+            posts = posts.published()
+        page, links = self.paginate(
+            self.serializer.values(posts, 'pub_date', 'id'),
+            MAX_POSTS_PAGE,
+            ('-pub_date', '-id'),
+        )
+        return {
+            'results': [self.serializer.serialize(row) for row in page],
+            **links,
+        }
+
+
+class PostApiView(ApiView):
+    """Пост, видимый пользователю, со всеми полями по умолчанию."""
+
+    serializer_class = PostSerializer
+    default_fields = tuple(PostSerializer.fields)
+    query_budget = 3
+
+    def get_validator_tags(self):
+        """Пост."""
+        return {post_tag(self.kwargs['post_id'])}
+
+    def get_data(self):
+        """Поля поста."""
+        row = self.serializer.values(
+            Post.objects.visible_to(self.request.user).filter(
+                pk=self.kwargs['post_id']
+            )
+        ).first()
+        if row is None:
+            raise Http404('Пост не найден.')
+        return self.serializer.serialize(row)
+
+
+class CommentListApiView(ApiView):
+    """Комментарии поста, видимого пользователю."""
+
+    serializer_class = CommentSerializer
+    query_budget = 4
+
+    def get_validator_tags(self):
+        """Комментарии сбрасывают теги своего поста."""
+        return {post_tag(self.kwargs['post_id'])}
+
+    def get_data(self):
+        """Страница комментариев."""
+        post_id = self.kwargs['post_id']
+        if not Post.objects.visible_to(self.request.user).filter(
+            pk=post_id
+        ).exists():
+            raise Http404('Пост не найден.')
+        page, links = self.paginate(
+            self.serializer.values(
+                Comment.objects.filter(post_id=post_id), *COMMENTS_ORDERING
+            ),
+            COMMENTS_PAGE_SIZE,
+            COMMENTS_ORDERING,
+        )
+        return {
+            'results': [self.serializer.serialize(row) for row in page],
+            **links,
+        }
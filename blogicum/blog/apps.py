@@ -7,3 +7,7 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        """Подключение обработчиков сигналов."""
+        from blog import signals  # noqa: F401
@@ -0,0 +1,200 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
+
+from blog.constants import (NEGATIVE_CACHE_TIMEOUT, PAGE_CACHE_TIMEOUT,
+                            REFERENCE_SNAPSHOT_TTL)
+
+
+INDEX_TAG = 'index'
+
+
+def post_tag(pk):
+    """Тег страницы поста."""
+    return f'post:{pk}'
+
+
+def category_tag(slug):
+    """Тег страниц, зависящих от категории."""
+    return f'category:{slug}'
+
+
+def location_tag(pk):
+    """Тег страниц, где выводится местоположение."""
+    return f'location:{pk}'
+
+
+def profile_tag(username):
+    """Тег страниц профиля автора."""
+    return f'profile:{username}'
+
+
+def reference_tag(model):
+    """Тег справочной модели (категории, местоположения)."""
+    return f'reference:{model._meta.label_lower}'
+
+
+def rendered_posts_tags(posts):
+    """Теги категорий и местоположений, выведенных в карточках постов."""
+    tags = set()
+    for post in posts:
+        if post.category_id:
+            tags.add(category_tag(post.category.slug))
+        if post.location_id:
+            tags.add(location_tag(post.location_id))
+    return tags
+
+
+def _tag_key(tag):
+    return f'blog:tag:{tag}'
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'blog:page:{path}'
+
+
+def tag_versions(tags, created=None):
+    """Текущие версии тегов.
+
+    Версия тега — время его последнего сброса. Отсутствующему (ещё не
+    сброшенному или вытесненному из кэша) тегу назначается новая версия,
+    поэтому страницы, сохранённые до вытеснения, считаются устаревшими.
+    Такие теги добавляются в множество `created`, если оно передано.
+    """
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key, tag in keys.items():
+        if key in found:
+            continue
+        version = time.time()
+        if cache.add(key, version, timeout=None):
+            if created is not None:
+                created.add(tag)
+        else:
+            version = cache.get(key, version)
+        found[key] = version
+    return {tag: found[key] for key, tag in keys.items()}
+
+
+def invalidate_tags(*tags):
+    """Сброс всех страниц, помеченных любым из тегов."""
+    tags = {tag for tag in tags if tag}
+    if tags:
+        now = time.time()
+        cache.set_many({_tag_key(tag): now for tag in tags}, timeout=None)
+
+
+def _text_html_key(text):
+    digest = hashlib.md5(text.encode()).hexdigest()
+    return f'blog:text_html:{digest}'
+
+
+def render_text(text):
+    """HTML текста: то же, что фильтр linebreaksbr в шаблоне."""
+    return str(linebreaksbr(text, autoescape=True))
+
+
+def store_text_html(*texts):
+    """Рендер текстов в кэш при их сохранении."""
+    cache.set_many(
+        {_text_html_key(text): render_text(text) for text in texts},
+        timeout=None,
+    )
+
+
+def text_html(text):
+    """HTML текста из кэша; при промахе рендерится и кладётся в кэш.
+
+    Ключ — хэш содержимого, поэтому изменённый текст просто получает
+    новую запись, а старая вытесняется из кэша как давно не читанная.
+    """
+    key = _text_html_key(text)
+    html = cache.get(key)
+    if html is None:
+        html = render_text(text)
+        cache.set(key, html, timeout=None)
+    return mark_safe(html)
+
+
+def _miss_key(kind, key):
+    digest = hashlib.md5(str(key).encode()).hexdigest()
+    return f'blog:miss:{kind}:{digest}'
+
+
+def is_known_miss(kind, key):
+    """Известно ли, что объекта `kind` с ключом `key` нет в БД."""
+    return cache.get(_miss_key(kind, key)) is not None
+
+
+# Бэкенды, кэш которых виден только своему процессу.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def negative_cache_timeout():
+    """Срок хранения промаха.
+
+    Промах забывается по сигналу создания объекта, но с локальным кэшем
+    только в процессе, где объект создан. Поэтому без общего кэша срок
+    ограничен REFERENCE_SNAPSHOT_TTL, как и устаревание снимков.
+    """
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return min(NEGATIVE_CACHE_TIMEOUT, REFERENCE_SNAPSHOT_TTL)
+    return NEGATIVE_CACHE_TIMEOUT
+
+
+def remember_miss(kind, key, timeout=None):
+    """Запомнить отсутствие объекта на `timeout` секунд.
+
+    По умолчанию срок берётся из negative_cache_timeout().
+    """
+    if timeout is None:
+        timeout = negative_cache_timeout()
+    cache.set(_miss_key(kind, key), True, timeout)
+
+
+def forget_miss(kind, key):
+    """Объект с ключом `key` появился: промах больше не действителен."""
+    cache.delete(_miss_key(kind, key))
+
+
+def get_cached_page(request):
+    """Сохранённый ответ для запроса, если ни один его тег не сброшен."""
+    entry = cache.get(_page_key(request))
+    if entry is None:
+        return None
+    versions, content, content_type = entry
+    if tag_versions(versions) != versions:
+        return None
+    return HttpResponse(content, content_type=content_type)
+
+
+def store_page(request, response, tags, started,
+               timeout=PAGE_CACHE_TIMEOUT):
+    """Сохранение отрендеренного ответа с версиями его тегов.
+
+    Если какой-то тег сброшен после `started` (начала обработки
+    запроса), страница могла собраться из устаревших данных и не
+    сохраняется.
+    """
+    created = set()
+    versions = tag_versions(tags, created)
+    if any(
+        version > started
+        for tag, version in versions.items()
+        if tag not in created
+    ):
+        return
+    cache.set(
+        _page_key(request),
+        (versions, response.content, response['Content-Type']),
+        timeout,
+    )
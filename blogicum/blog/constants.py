@@ -1,3 +1,19 @@
 MAX_LENGTH_TITLE: int = 256
 MAX_LENGTH_RENDER_TITLE: int = 20
 MAX_POSTS_PAGE: int = 10
+N_PLUS_ONE_THRESHOLD: int = 3
+COMMENTS_PAGE_SIZE: int = 20
+COMMENTS_ORDERING: tuple = ('created_at', 'id')
+PAGE_CACHE_TIMEOUT: int = 300
+COUNT_CACHE_TIMEOUT: int = 300
+PAGE_WINDOW_ON_EACH_SIDE: int = 2
+PAGE_WINDOW_ON_ENDS: int = 1
+POST_EXCERPT_WORDS: int = 10
+CATEGORY_VISIBILITY_CHUNK = 1000
+REFERENCE_CACHE_SIZE = 8
+REFERENCE_SNAPSHOT_TTL = 60
+AUTOCOMPLETE_LIMIT = 20
+NEGATIVE_CACHE_TIMEOUT = 600
+API_BATCH_LIMIT = 100
+# значения, которые помещаются в 64-битную целочисленную колонку БД
+DB_INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
@@ -1,9 +1,119 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
 from django.utils import timezone
 
 from blog.models import Comment, Post
 
 
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора из снимка справочника вместо запроса к БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.snapshot():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.snapshot()) + (
+            self.field.empty_label is not None
+        )
+
+
+class ReferenceSelect(forms.Select):
+    """Select, HTML которого хранится в снимке справочника.
+
+    Снимок заменяется при изменении таблицы, поэтому сохранённый HTML
+    устаревает вместе с ним.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        """HTML из снимка или рендер с сохранением в снимок."""
+        rendered = self.choices.field.snapshot().rendered
+        key = (
+            name,
+            str(value),
+            tuple(sorted(self.build_attrs(self.attrs, attrs).items())),
+        )
+        if key not in rendered:
+            rendered[key] = super().render(name, value, attrs, renderer)
+        return rendered[key]
+
+
+class AutocompleteSelect(forms.Select):
+    """Select для больших таблиц: выводится только выбранный вариант.
+
+    Остальные варианты скрипт страницы запрашивает по префиксу у
+    представления `url_name` (атрибут data-autocomplete-url).
+    """
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        """Контекст с адресом автодополнения."""
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = reverse(
+            self.url_name
+        )
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        """Пустой и выбранный варианты без перебора всей таблицы."""
+        iterator = self.choices
+        choices = []
+        if iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        pks = [pk for pk in value if str(pk).isdigit()]
+        if pks:
+            choices.extend(
+                iterator.choice(obj)
+                for obj in iterator.queryset.filter(pk__in=pks)
+            )
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """Выбор объекта справочной модели с ReferenceManager.
+
+    Список вариантов и проверка значения берутся из snapshot() модели,
+    поэтому ни рендер формы, ни валидация не обращаются к БД.
+    Фильтры queryset поля (limit_choices_to) не применяются.
+    """
+
+    iterator = ReferenceChoiceIterator
+    widget = ReferenceSelect
+
+    def snapshot(self):
+        """Снимок справочной таблицы поля."""
+        return self.queryset.model._default_manager.snapshot()
+
+    def to_python(self, value):
+        """Объект справочника по первичному ключу."""
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.snapshot().get(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
+
 class PostForm(forms.ModelForm):
     """Форма поста на основе модели."""
 
@@ -19,8 +129,15 @@ class PostForm(forms.ModelForm):
 
         model = Post
         exclude = ('author',)
+        # категорий мало: варианты из снимка справочника; мест может
+        # быть много: выбранное проверяется одним запросом по id,
+        # остальные подгружаются автодополнением
+        field_classes = {'category': ReferenceChoiceField}
         widgets = {
-            'pub_date': forms.DateTimeInput(attrs={'type': 'datetime-local'})
+            'pub_date': forms.DateTimeInput(
+                attrs={'type': 'datetime-local'}
+            ),
+            'location': AutocompleteSelect('blog:location_autocomplete'),
         }
 
 
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Команда пересчёта анонсов постов."""
+
+    help = (
+        'Пересчитывает Post.excerpt по тексту постов (например, после '
+        'loaddata, ручных правок в БД или изменения длины анонса).'
+    )
+
+    def handle(self, *args, **options):
+        """Пересчёт анонсов пачками по BATCH_SIZE постов."""
+        updated = 0
+        batch = []
+        posts = Post.objects.only('text', 'excerpt').order_by('pk')
+        for post in posts.iterator(chunk_size=BATCH_SIZE):
+            excerpt = Post.make_excerpt(post.text)
+            if excerpt == post.excerpt:
+                continue
+            post.excerpt = excerpt
+            batch.append(post)
+            if len(batch) == BATCH_SIZE:
+                Post.objects.bulk_update(batch, ['excerpt'])
+                updated += len(batch)
+                batch = []
+        Post.objects.bulk_update(batch, ['excerpt'])
+        updated += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено анонсов: {updated}')
+        )
@@ -0,0 +1,28 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from blog.cache import INDEX_TAG, category_tag, invalidate_tags
+from blog.models import Category, FeedEntry
+
+
+class Command(BaseCommand):
+    """Команда пересборки таблицы ленты."""
+
+    help = (
+        'Пересобирает blog_feedentry по постам и категориям '
+        '(например, после loaddata, QuerySet.update() или ручных '
+        'правок в БД, которые не вызывают сигналы).'
+    )
+
+    def handle(self, *args, **options):
+        """Пересборка таблицы и сброс кэша лент."""
+        # лента строится по category_published: сначала сверяем его
+        call_command('sync_category_published', stdout=self.stdout)
+        entries = FeedEntry.objects.rebuild()
+        invalidate_tags(INDEX_TAG, *(
+            category_tag(slug)
+            for slug in Category.objects.values_list('slug', flat=True)
+        ))
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в ленте: {entries}')
+        )
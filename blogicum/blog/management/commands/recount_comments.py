@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    """Команда пересчёта счётчиков комментариев."""
+
+    help = (
+        'Пересчитывает Post.comment_count по таблице комментариев '
+        '(например, после loaddata или ручных правок в БД).'
+    )
+
+    def handle(self, *args, **options):
+        """Пересчёт всех постов одним UPDATE."""
+        updated = Post.objects.recount_comments()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано постов: {updated}')
+        )
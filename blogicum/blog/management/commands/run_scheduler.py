@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.scheduler import PublicationScheduler
+
+
+class Command(BaseCommand):
+    """Команда запуска планировщика отложенных публикаций."""
+
+    help = (
+        'Объявляет опубликованными посты с наступившей датой и сбрасывает '
+        'кэш лент. Без --once работает постоянно, засыпая до ближайшей '
+        'публикации, но не дольше --max-sleep секунд. Нужна только при '
+        'общем кэше: иначе ленты обновляют сами веб-процессы.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы командной строки."""
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать наступившие публикации и выйти.',
+        )
+        parser.add_argument(
+            '--max-sleep', type=float, default=60,
+            help='Наибольшая пауза между проверками, в секундах.',
+        )
+
+    def handle(self, *args, once=False, max_sleep=60, **options):
+        """Цикл планировщика."""
+        scheduler = PublicationScheduler()
+        while True:
+            post_ids = scheduler.run_pending()
+            if post_ids:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Опубликовано постов: {len(post_ids)}')
+                )
+            if once:
+                return
+            # новые отложенные посты могут появиться в любой момент,
+            # поэтому ожидание ограничено max_sleep
+            delay = max_sleep
+            next_run = scheduler.next_run_at()
+            if next_run is not None:
+                delay = min(
+                    delay, (next_run - timezone.now()).total_seconds()
+                )
+            time.sleep(max(delay, 0))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Category, Post
+from blog.signals import apply_category_visibility
+
+
+class Command(BaseCommand):
+    """Команда сверки статуса категорий в постах."""
+
+    help = (
+        'Приводит Post.category_published к статусу категорий постов '
+        '(например, после loaddata, raw-сохранений или ручных правок в БД, '
+        'которые не вызывают Post.save() и сигналы).'
+    )
+
+    def handle(self, *args, **options):
+        """Сверка по категориям с обновлением ленты и сбросом кэша."""
+        updated = 0
+        for category_id in Category.objects.values_list('pk', flat=True):
+            updated += apply_category_visibility(category_id)
+        # у постов без категории статус всегда False
+        updated += Post.objects.filter(
+            category__isnull=True, category_published=True
+        ).update(category_published=False)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено постов: {updated}')
+        )
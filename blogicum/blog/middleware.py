@@ -0,0 +1,116 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from blog.constants import N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger('blog.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к странице превысил бюджет запросов к БД."""
+
+
+class QueryCounter:
+    """Счётчик SQL-запросов, сгруппированных по форме.
+
+    Формой считается текст запроса с плейсхолдерами, без параметров,
+    поэтому одинаковые запросы для разных объектов совпадают.
+    """
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[sql] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        """Общее число запросов."""
+        return sum(self.shapes.values())
+
+    @contextmanager
+    def excluded(self):
+        """Запросы внутри блока не учитываются в бюджете."""
+        shapes = self.shapes.copy()
+        try:
+            yield
+        finally:
+            self.shapes = shapes
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Формы запросов, повторившиеся не менее `threshold` раз."""
+        return {
+            sql: count for sql, count in self.shapes.items()
+            if count >= threshold
+        }
+
+
+@contextmanager
+def outside_budget(request):
+    """Служебная работа запроса, не входящая в бюджет представления."""
+    counter = getattr(request, 'query_counter', None)
+    if counter is None:
+        yield
+        return
+    with counter.excluded():
+        yield
+
+
+class QueryBudgetMiddleware:
+    """Контроль числа запросов к БД на один HTTP-запрос.
+
+    Представление объявляет лимит атрибутом `query_budget`. При его
+    превышении или при повторе одной формы запроса (N+1) пишется
+    предупреждение в лог `blog.queries`, а при QUERY_BUDGET_RAISE
+    выбрасывается QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_counter = QueryCounter()
+        request.query_budget = None
+        with connection.execute_wrapper(request.query_counter):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content
+            )
+        else:
+            self.check(request)
+        return response
+
+    def stream(self, request, content):
+        """Потоковый ответ: запросы во время отдачи тоже в бюджете."""
+        with connection.execute_wrapper(request.query_counter):
+            yield from content
+        self.check(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Запоминаем бюджет представления."""
+        view = getattr(view_func, 'view_class', view_func)
+        request.query_budget = getattr(view, 'query_budget', None)
+
+    def check(self, request):
+        """Сверка числа запросов с бюджетом."""
+        counter = request.query_counter
+        problems = []
+        budget = request.query_budget
+        if budget is not None and counter.total > budget:
+            problems.append(
+                f'{counter.total} запросов при бюджете {budget}'
+            )
+        for sql, count in counter.repeated().items():
+            problems.append(f'N+1: {count} раз «{sql}»')
+        if not problems:
+            return
+        message = f'{request.method} {request.path}: ' + '; '.join(problems)
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
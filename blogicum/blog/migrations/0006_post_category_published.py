@@ -0,0 +1,28 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+def fill_category_published(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(
+        models.Q(category__isnull=True) | models.Q(category__is_published=False)
+    ).update(category_published=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='category_published',
+            field=models.BooleanField(default=True, editable=False, help_text='Копия Category.is_published для фильтров без JOIN.', verbose_name='Категория опубликована'),
+        ),
+        migrations.RunPython(
+            fill_category_published, migrations.RunPython.noop
+        ),
+    ]
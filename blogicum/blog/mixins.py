@@ -1,15 +1,56 @@
+import hashlib
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+from blog.cache import (get_cached_page, is_known_miss, reference_tag,
+                        remember_miss, store_page, tag_versions)
 from blog.constants import MAX_POSTS_PAGE
 from blog.forms import CommentForm, PostForm
-from blog.models import Comment, Post
+from blog.middleware import outside_budget
+from blog.models import (Category, Comment, FeedEntry, Location, Post,
+                         published_until)
+from blog.paginators import (CachedCountPaginator, CursorPaginator,
+                             encode_cursor)
+from blog.scheduler import publish_due
 
+from django.conf import settings
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.db.models import Count
+from django.db.models import QuerySet
+from django.http import Http404, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import redirect
+from django.template.context import make_context
+from django.template.loader import get_template, select_template
 from django.urls import reverse
-from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
+from pages.views import cached_not_found
 
 
 # Кастомные миксины
+class ObjectCacheMixin:
+    """Миксин: целевой объект загружается один раз за запрос.
+
+    test_func, get() и post() представления получают один и тот же
+    экземпляр вместе со связанными объектами из `related_fields`
+    (задаются в PostMixin и CommentMixin).
+    """
+
+    def get_queryset(self):
+        """Queryset с подгрузкой связанных объектов."""
+        return super().get_queryset().select_related(*self.related_fields)
+
+    def get_object(self, queryset=None):
+        """Объект из кэша представления."""
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+
 class PostMixin:
     """Класс Mixin для постов."""
 
@@ -17,6 +58,7 @@ class PostMixin:
     form_class = PostForm
     template_name = 'blog/create.html'
     pk_url_kwarg = 'post_id'
+    related_fields = ('author', 'category', 'location')
 
 
 class CommentMixin:
@@ -24,6 +66,7 @@ class CommentMixin:
 
     model = Comment
     form_class = CommentForm
+    related_fields = ('author', 'post__author', 'post__category')
 
     def get_success_url(self):
         """Функция для переадресации пользователя."""
@@ -32,37 +75,367 @@ class CommentMixin:
         )
 
 
-class AuthorMixin(UserPassesTestMixin):
+class AuthorMixin(ObjectCacheMixin, UserPassesTestMixin):
     """Класс миксин для автора."""
 
     def test_func(self):
         """Функция для проверки автора."""
-        return self.get_object().author == self.request.user
+        return self.get_object().author_id == self.request.user.id
 
     def handle_no_permission(self):
         """Если пользователь не автор."""
         return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
 
 
-class BaseMixin:
-    """Миксин для: главная, посты категории, посты пользователя."""
+class NegativeCacheMixin:
+    """Кэш промахов для адресов с несуществующими объектами.
+
+    Если страница ответила 404 и object_exists() подтвердил, что
+    объекта с ключом из URL (`negative_cache_kwarg`) нет, ключ
+    запоминается. Следующие запросы с этим ключом получают готовую
+    страницу 404 без обращения к БД, пока сигнал создания объекта
+    не сбросит промах или не истечёт срок negative_cache_timeout()
+    (с локальным кэшем — не дольше REFERENCE_SNAPSHOT_TTL).
+    """
+
+    negative_cache_kind = None
+    negative_cache_kwarg = None
+
+    def object_exists(self):
+        """Есть ли в БД объект с ключом из URL."""
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        """Готовый 404 для известных промахов."""
+        key = self.kwargs[self.negative_cache_kwarg]
+        if is_known_miss(self.negative_cache_kind, key):
+            return cached_not_found()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            if not self.object_exists():
+                remember_miss(self.negative_cache_kind, key)
+            raise
+
+
+class ScheduledPublicationMixin:
+    """Миксин: до ответа публикуются посты, чья дата наступила.
+
+    Сбрасывает теги лент, в которые попали отложенные посты, раньше,
+    чем по ним будут проверены кэш страниц и ETag (см. publish_due).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """Запуск планировщика при смене границы публикации.
+
+        Раз в сутки первый запрос выполняет работу планировщика; она
+        не относится к странице и не входит в её бюджет запросов.
+        """
+        with outside_budget(request):
+            publish_due()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified по версиям тегов страницы.
+
+    Версия тега — время его последнего сброса (см. blog.cache), поэтому
+    наибольшая версия (или начало текущих суток, когда видимыми стали
+    отложенные посты) служит датой изменения. ETag — отпечаток версий,
+    адреса, сессии и CSRF-cookie пользователя и границы публикации.
+    Валидаторы вычисляются до основного запроса и рендера, и 304
+    отдаётся без обращения к БД.
+    """
+
+    def get_validator_tags(self):
+        """Теги, от которых зависит содержимое страницы."""
+        raise NotImplementedError
+
+    def get_validators(self, request):
+        """Пара (ETag, Last-Modified в секундах)."""
+        tags = set(self.get_validator_tags())
+        # названия и статусы категорий и мест выводятся в карточках
+        tags.update((reference_tag(Category), reference_tag(Location)))
+        versions = tag_versions(tags)
+        boundary = published_until()
+        fingerprint = repr((
+            request.get_full_path(),
+            request.user.pk,
+            # формы страницы несут CSRF-токен: после нового входа
+            # старая копия с прежним токеном не годится
+            request.session.session_key,
+            request.META.get('CSRF_COOKIE'),
+            # в полночь посты становятся видимыми без сброса тегов
+            boundary,
+            sorted(versions.items()),
+        ))
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        day_start = (boundary - timedelta(days=1)).timestamp()
+        return etag, int(max(day_start, *versions.values()))
+
+    def dispatch(self, request, *args, **kwargs):
+        """304 для актуальной копии или ответ с валидаторами."""
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class PageCacheMixin:
+    """Кэш целых страниц для анонимных GET-запросов.
+
+    Представление перечисляет теги страницы в get_page_cache_tags();
+    сигналы моделей сбрасывают теги, и зависящие от них страницы
+    перестают отдаваться из кэша. Авторизованные пользователи кэш
+    не используют.
+    """
+
+    def get_page_cache_tags(self, response):
+        """Теги отрендеренной страницы."""
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        """Ответ из кэша или рендер с сохранением в кэш."""
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        cached = get_cached_page(request)
+        if cached is not None:
+            return cached
+        started = time.time()
+        response = super().dispatch(request, *args, **kwargs)
+        if (
+            response.status_code == HTTPStatus.OK
+            and hasattr(response, 'add_post_render_callback')
+        ):
+            response.add_post_render_callback(
+                lambda rendered: store_page(
+                    request,
+                    rendered,
+                    self.get_page_cache_tags(rendered),
+                    started,
+                )
+            )
+        return response
+
+
+class StreamingMixin:
+    """Потоковая отдача длинных страниц при STREAMING_PAGES.
+
+    Шаблон страницы рендерится с `stream_marker` вместо списка
+    объектов: всё до метки (<head>, шапка, заголовок) уходит клиенту
+    сразу, затем по одному — объекты из контекста `stream_items` через
+    шаблон `stream_item_template`, потом остаток страницы. Анонимные
+    страницы целиком берутся из кэша страниц и не стримятся.
+
+    До отправки <head> выполняются только лёгкие запросы: страница
+    выбирается по ключам сортировки, а сами объекты читаются через
+    iterator() уже во время отдачи (см. defer_page).
+    """
+
+    stream_items = 'page_obj'
+    stream_item_name = 'post'
+    stream_item_template = 'includes/post_article.html'
+
+    def use_streaming(self):
+        """Стримить ли ответ на текущий запрос."""
+        return (
+            getattr(settings, 'STREAMING_PAGES', False)
+            and self.request.user.is_authenticated
+        )
+
+    @staticmethod
+    def defer_page(page, queryset, ordering):
+        """Страница ключей `page` с ленивым queryset объектов.
+
+        Объекты страницы ключей (строки с pk и полями сортировки)
+        остаются в `page.key_rows` для курсоров, а `object_list`
+        становится невыполненным queryset тех же объектов.
+        """
+        page.key_rows = list(page.object_list)
+        page.object_list = queryset.filter(
+            pk__in=[row.pk for row in page.key_rows]
+        ).order_by(*ordering)
+        return page
+
+    def render_to_response(self, context, **response_kwargs):
+        """Потоковый ответ вместо TemplateResponse."""
+        if not self.use_streaming():
+            return super().render_to_response(context, **response_kwargs)
+        # рендер идёт уже после middleware: cookie CSRF нужна заранее
+        get_token(self.request)
+        return StreamingHttpResponse(
+            self.stream(context),
+            content_type='text/html; charset=utf-8',
+            status=response_kwargs.get('status', HTTPStatus.OK),
+        )
+
+    def stream(self, context):
+        """Части страницы по мере рендера."""
+        marker = f'<!--stream-{id(self)}-->'
+        page = select_template(self.get_template_names()).render(
+            {**context, 'stream_marker': mark_safe(marker)}, self.request
+        )
+        head, tail = page.split(marker, 1)
+        yield head
+        item_template = get_template(self.stream_item_template).template
+        item_context = make_context(context, self.request)
+        items = context[self.stream_items]
+        items = getattr(items, 'object_list', items)
+        if isinstance(items, QuerySet):
+            # запрос объектов выполняется только здесь, после <head>
+            items = items.iterator()
+        with item_context.bind_template(item_template):
+            for item in items:
+                with item_context.push({self.stream_item_name: item}):
+                    yield item_template.render(item_context)
+        yield tail
+
+
+class FeedFragmentMixin:
+    """Фрагменты ленты для бесконечной прокрутки.
+
+    Представление, созданное с `fragment=True`, отдаёт только карточки
+    следующей порции постов (курсорная пагинация) и ссылку на
+    продолжение. Полная страница получает в контексте `fragment_url`
+    и `next_cursor`, по которым скрипт в paginator.html подгружает
+    фрагменты.
+    """
+
+    fragment = False
+    fragment_template_name = 'includes/post_list.html'
+    page_url_name = None
+    fragment_url_name = None
+
+    def get_template_names(self):
+        """Шаблон фрагмента вместо страницы."""
+        if self.fragment:
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def use_cursor_pagination(self):
+        """Фрагменты всегда листаются по курсору."""
+        return self.fragment or super().use_cursor_pagination()
+
+    def use_streaming(self):
+        """Короткие фрагменты не стримятся."""
+        return not self.fragment and super().use_streaming()
+
+    def get_context_data(self, **kwargs):
+        """Адреса страницы и фрагментов и курсор продолжения."""
+        context = super().get_context_data(**kwargs)
+        context['page_url'] = reverse(self.page_url_name, kwargs=self.kwargs)
+        context['fragment_url'] = reverse(
+            self.fragment_url_name, kwargs=self.kwargs
+        )
+        context['next_cursor'] = self.get_next_cursor(context['page_obj'])
+        return context
+
+    @staticmethod
+    def get_next_cursor(page):
+        """Курсор постов после страницы (обычной или курсорной)."""
+        if getattr(page, 'is_cursor', False):
+            return page.next_cursor
+        if not page.has_next():
+            return None
+        # строки ключей не заставляют читать посты отложенной страницы
+        rows = getattr(page, 'key_rows', page)
+        if not len(rows):
+            return None
+        last = rows[-1]
+        # ключ (pub_date, pk) одинаков для записей FeedEntry и постов
+        return encode_cursor([last.pub_date, last.pk])
+
+
+class CursorPaginationMixin:
+    """Миксин курсорной пагинации для списков постов.
+
+    Режим включается атрибутом `cursor_pagination` или параметрами
+    `?after=`/`?before=` в запросе; иначе работает обычный Paginator.
+    """
+
+    cursor_pagination = False
+    cursor_ordering = ('-pub_date', '-id')
+
+    def use_cursor_pagination(self):
+        """Включен ли курсорный режим для текущего запроса."""
+        return self.cursor_pagination or any(
+            key in self.request.GET for key in ('after', 'before')
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """Пагинация по ключу (pub_date, id) вместо OFFSET."""
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        page = paginator.page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class CountCacheMixin:
+    """Миксин кэширования числа постов в ленте для Paginator."""
+
+    paginator_class = CachedCountPaginator
+
+    def get_count_cache_key(self):
+        """Ключ кэша числа постов и теги, при сбросе которых он устаревает."""
+        return None, ()
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        """Paginator с ключом кэша числа объектов."""
+        count_key, count_tags = self.get_count_cache_key()
+        return super().get_paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            count_key=count_key, count_tags=count_tags, **kwargs
+        )
+
+
+class BaseMixin(CountCacheMixin, CursorPaginationMixin):
+    """Миксин для лент: главная и посты категории.
+
+    Страница выбирается по узкой таблице FeedEntry, затем её посты
+    загружаются одним запросом по первичному ключу. Используется вместе
+    со StreamingMixin: при потоковой отдаче посты читаются после <head>.
+    """
 
     model = Post
     paginate_by = MAX_POSTS_PAGE
+    cursor_ordering = ('-pub_date', '-post_id')
 
     def get_queryset(self):
-        """Метод queryset."""
-        return (
-            Post.objects.select_related(
-                'location',
-                'author',
-                'category',
-            )
-            .filter(
-                is_published=True,
-                category__is_published=True,
-                pub_date__date__lte=timezone.now(),
-            )
-            .annotate(comment_count=Count('comments'))
-            .order_by('-pub_date')
+        """Записи ленты в порядке вывода."""
+        return FeedEntry.objects.published().order_by('-pub_date', '-post_id')
+
+    def paginate_queryset(self, queryset, page_size):
+        """Пагинация записей ленты с заменой их на посты."""
+        paginator, page, entries, is_paginated = super().paginate_queryset(
+            queryset, page_size
         )
+        posts = Post.objects.select_related(
+            'location', 'author', 'category'
+        ).defer('text')
+        if self.use_streaming():
+            # порядок записей ленты совпадает с порядком их постов
+            self.defer_page(page, posts, ('-pub_date', '-id'))
+        else:
+            page.object_list = self.get_posts(posts, entries)
+        return paginator, page, page.object_list, is_paginated
+
+    @staticmethod
+    def get_posts(posts, entries):
+        """Посты записей ленты в том же порядке."""
+        ids = [entry.post_id for entry in entries]
+        posts = posts.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -1,14 +1,77 @@
+import hashlib
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from time import monotonic
+
 from core.models import PublishedAndCreatedModel
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import Truncator
 
-from blog.constants import MAX_LENGTH_RENDER_TITLE, MAX_LENGTH_TITLE
+from blog.cache import (reference_tag, store_text_html, tag_versions,
+                        text_html)
+from blog.constants import (AUTOCOMPLETE_LIMIT, CATEGORY_VISIBILITY_CHUNK,
+                            MAX_LENGTH_RENDER_TITLE, MAX_LENGTH_TITLE,
+                            POST_EXCERPT_WORDS, REFERENCE_CACHE_SIZE,
+                            REFERENCE_SNAPSHOT_TTL)
 
 User = get_user_model()
 
 
+class ReferenceSnapshot:
+    """Неизменяемый снимок справочной таблицы с картами поиска."""
+
+    def __init__(self, objects):
+        self.objects = tuple(objects)
+        # отрендеренные виджеты выбора (см. blog.forms.ReferenceSelect)
+        self.rendered = {}
+        self.by_pk = {obj.pk: obj for obj in self.objects}
+        self.by_slug = {
+            obj.slug: obj for obj in self.objects if hasattr(obj, 'slug')
+        }
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get(self, pk):
+        """Объект по первичному ключу или None."""
+        return self.by_pk.get(pk)
+
+
+@lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def _load_snapshot(model, version, epoch):
+    """Снимок таблицы для версии и эпохи; старые вытесняет LRU."""
+    return ReferenceSnapshot(model._base_manager.order_by('pk'))
+
+
+class ReferenceManager(models.Manager):
+    """Менеджер маленьких, редко меняющихся справочных таблиц.
+
+    snapshot() отдаёт всю таблицу из памяти процесса. Версия снимка —
+    версия тега reference_tag() в кэше: сигналы сбрасывают тег при
+    изменении строк, и процессы с общим кэшем перечитывают таблицу при
+    следующем обращении. Изменения из других процессов при локальном
+    кэше видны не позже чем через REFERENCE_SNAPSHOT_TTL секунд: снимок
+    принадлежит ещё и эпохе этой длины.
+    """
+
+    def snapshot(self):
+        """Актуальный снимок таблицы."""
+        tag = reference_tag(self.model)
+        return _load_snapshot(
+            self.model,
+            tag_versions([tag])[tag],
+            int(monotonic() // REFERENCE_SNAPSHOT_TTL),
+        )
+
+
 class Category(PublishedAndCreatedModel):
     """Модель категории."""
 
@@ -21,6 +84,8 @@ class Category(PublishedAndCreatedModel):
                    'разрешены символы латиницы, цифры, дефис и подчёркивание.')
     )
 
+    objects = ReferenceManager()
+
     class Meta:
         """Метакласс."""
 
@@ -32,22 +97,131 @@ class Category(PublishedAndCreatedModel):
         return self.title[:MAX_LENGTH_RENDER_TITLE]
 
 
+class LocationQuerySet(models.QuerySet):
+    """QuerySet местоположений."""
+
+    def name_prefix(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Опубликованные места, название которых начинается с `prefix`.
+
+        Префикс ищется как есть и с заглавной первой буквой. Условие —
+        диапазон от prefix до prefix с последним символом Unicode, который,
+        в отличие от LIKE, читается по индексу location_name_idx.
+        """
+        condition = models.Q()
+        for variant in {prefix, prefix[:1].upper() + prefix[1:]}:
+            condition |= models.Q(
+                name__gte=variant, name__lt=variant + '\U0010ffff'
+            )
+        return self.filter(condition, is_published=True).order_by(
+            'name'
+        )[:limit]
+
+
 class Location(PublishedAndCreatedModel):
     """Модель локации."""
 
     name = models.CharField('Название места', max_length=MAX_LENGTH_TITLE)
 
+    objects = ReferenceManager.from_queryset(LocationQuerySet)()
+
     class Meta:
         """Метакласс."""
 
         verbose_name = 'местоположение'
         verbose_name_plural = 'Местоположения'
+        indexes = (
+            models.Index(fields=('name',), name='location_name_idx'),
+        )
 
     def __str__(self) -> str:
         """Строковое представление объекта."""
         return self.name[:MAX_LENGTH_RENDER_TITLE]
 
 
+def published_until(now=None):
+    """Начало завтрашнего дня в TIME_ZONE (относительно `now`).
+
+    Пост опубликован, если его дата (в местном времени) не позже
+    сегодняшней, то есть pub_date строго меньше этой границы. Сравнение
+    с готовым значением, в отличие от pub_date__date, использует индекс.
+    """
+    tomorrow = timezone.localdate(now) + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(tomorrow, time.min))
+
+
+class PostQuerySet(models.QuerySet):
+    """QuerySet постов."""
+
+    @staticmethod
+    def published_q():
+        """Условие публикации: пост и категория опубликованы, дата пришла.
+
+        Статус категории читается из category_published, поэтому условие
+        проверяется по одной таблице, без соединения с blog_category.
+        """
+        return models.Q(
+            is_published=True,
+            category__isnull=False,
+            category_published=True,
+            pub_date__lt=published_until(),
+        )
+
+    def published(self):
+        """Посты, видимые всем."""
+        return self.filter(self.published_q())
+
+    def visible_to(self, user):
+        """Посты, видимые пользователю: опубликованные и все свои."""
+        if user.is_authenticated:
+            return self.filter(self.published_q() | models.Q(author=user))
+        return self.published()
+
+    def recount_comments(self):
+        """Пересчитать сохранённое число комментариев у постов."""
+        comments = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.update(comment_count=Coalesce(Subquery(comments), 0))
+
+    def sync_category_published(self, category_id,
+                                chunk_size=CATEGORY_VISIBILITY_CHUNK):
+        """Привести category_published постов к статусу их категории.
+
+        Посты обновляются пачками по chunk_size, каждая в своей короткой
+        транзакции, поэтому категория со множеством постов не держит
+        блокировку на всё время обновления. Пачки выбираются по
+        возрастанию pk после последней обработанной, так что каждая
+        читает индекс категории с нужного места, без сортировки всех
+        постов. Записи ленты обновляются в тех же транзакциях.
+        Возвращает число обновлённых постов.
+        """
+        is_published = Category.objects.filter(
+            pk=category_id, is_published=True
+        ).exists()
+        stale = (
+            self.filter(category_id=category_id)
+            .exclude(category_published=is_published)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        updated = last_pk = 0
+        while True:
+            with transaction.atomic():
+                pks = list(stale.filter(pk__gt=last_pk)[:chunk_size])
+                if not pks:
+                    return updated
+                self.filter(pk__in=pks).update(
+                    category_published=is_published
+                )
+                FeedEntry.objects.sync_posts(pks)
+            updated += len(pks)
+            last_pk = pks[-1]
+
+
 class Post(PublishedAndCreatedModel):
     """Модель поста."""
 
@@ -86,6 +260,26 @@ class Post(PublishedAndCreatedModel):
         blank=True,
         verbose_name='Изображение'
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+        help_text='Поддерживается сигналами модели комментариев.'
+    )
+    excerpt = models.TextField(
+        'Анонс',
+        blank=True,
+        editable=False,
+        help_text='Начало текста для карточек в лентах.'
+    )
+    category_published = models.BooleanField(
+        'Категория опубликована',
+        default=True,
+        editable=False,
+        help_text='Копия Category.is_published для фильтров без JOIN.'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         """Метакласс."""
@@ -93,15 +287,193 @@ class Post(PublishedAndCreatedModel):
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            # Главная и лента категории читают FeedEntry со своими
+            # индексами. Профиль: автор видит и неопубликованные посты.
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         """Строковое представление объекта."""
         return self.title[:MAX_LENGTH_RENDER_TITLE]
 
+    @staticmethod
+    def make_excerpt(text):
+        """Анонс поста: то же, что фильтр truncatewords в карточке."""
+        return Truncator(text).words(POST_EXCERPT_WORDS, truncate=' …')
+
+    def save(self, *args, **kwargs):
+        """Сохранение с пересчётом анонса, статуса категории и HTML текста.
+
+        Статус категории читается из БД, а не из прикреплённого объекта:
+        форма берёт категорию из снимка справочника, который в другом
+        процессе может быть устаревшим.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'category' in update_fields:
+            self.category_published = bool(
+                self.category_id
+                and Category._base_manager.filter(
+                    pk=self.category_id, is_published=True
+                ).exists()
+            )
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'category_published'
+                }
+        text_loaded = 'text' not in self.get_deferred_fields()
+        if text_loaded:
+            self.excerpt = self.make_excerpt(self.text)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'text' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+        if text_loaded:
+            store_text_html(self.text)
+
+    @property
+    def text_html(self):
+        """Текст поста в HTML из кэша рендера."""
+        return text_html(self.text)
+
     def get_absolute_url(self):
         """Функция переадресацции."""
         return reverse('blog:post_detail', kwargs={'id': self.id})
 
+    @property
+    def card_version(self):
+        """Отпечаток всех данных карточки поста для ключа кэша фрагмента.
+
+        Любая правка поста, его категории, местоположения, автора или
+        числа комментариев даёт новый ключ, поэтому явная инвалидация
+        не нужна.
+        """
+        category, location = self.category, self.location
+        parts = (
+            self.title, self.excerpt, self.pub_date.isoformat(),
+            self.image.name, self.is_published, self.comment_count,
+            self.author.username,
+            category and (category.slug, category.title,
+                          category.is_published),
+            location and (location.name, location.is_published),
+        )
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+class FeedEntryQuerySet(models.QuerySet):
+    """QuerySet записей ленты."""
+
+    def published(self):
+        """Записи постов, дата публикации которых уже пришла."""
+        return self.filter(pub_date__lt=published_until())
+
+    def sync_post(self, post):
+        """Добавить, обновить или убрать запись поста после его сохранения.
+
+        Хватает одного-двух запросов: статус категории хранится в посте.
+        """
+        if not (post.is_published and post.category_published):
+            self.filter(post_id=post.pk).delete()
+            return
+        values = {
+            'category_id': post.category_id,
+            'author_id': post.author_id,
+            'pub_date': post.pub_date,
+        }
+        if not self.filter(post_id=post.pk).update(**values):
+            self.create(post_id=post.pk, **values)
+
+    def sync_posts(self, pks):
+        """Пересобрать записи ленты для постов с первичными ключами `pks`."""
+        self.filter(post_id__in=pks).delete()
+        self.bulk_create(
+            self.model(**values) for values in (
+                Post.objects.filter(
+                    pk__in=pks,
+                    is_published=True,
+                    category__isnull=False,
+                    category_published=True,
+                ).values('category_id', 'author_id', 'pub_date',
+                         post_id=models.F('pk'))
+            )
+        )
+
+    def rebuild(self):
+        """Пересобрать таблицу целиком по постам."""
+        self.all().delete()
+        entries = self.bulk_create(
+            self.model(**values) for values in (
+                Post.objects.filter(
+                    is_published=True,
+                    category__isnull=False,
+                    category_published=True,
+                ).values('category_id', 'author_id', 'pub_date',
+                         post_id=models.F('pk'))
+            )
+        )
+        return len(entries)
+
+
+class FeedEntry(models.Model):
+    """Запись ленты: опубликованный пост в опубликованной категории.
+
+    Узкая таблица поддерживается сигналами постов и категорий, чтобы
+    главная и лента категории листались без соединения трёх таблиц.
+    Будущие посты тоже хранятся: дату сравнивает FeedEntryQuerySet.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_entry',
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='+'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        """Метакласс."""
+
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-post'),
+                name='feedentry_feed_idx',
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-post'),
+                name='feedentry_category_feed_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        """Строковое представление объекта."""
+        return f'{self.pub_date:%Y-%m-%d %H:%M} #{self.post_id}'
+
+
+class CommentQuerySet(models.QuerySet):
+    """QuerySet комментариев."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не шлёт сигналы, поэтому счётчики пересчитываем."""
+        objs = super().bulk_create(objs, *args, **kwargs)
+        store_text_html(*{obj.text for obj in objs})
+        Post.objects.filter(
+            pk__in={obj.post_id for obj in objs}
+        ).recount_comments()
+        return objs
+
 
 class Comment(models.Model):
     """Модель комментариев."""
@@ -117,13 +489,32 @@ class Comment(models.Model):
         User, on_delete=models.CASCADE, related_name='comments'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         """Метакласс."""
 
         verbose_name = 'комментарии'
         verbose_name_plural = 'Комментарии'
         ordering = ('created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at', 'id'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         """Строковое представление объекта."""
         return self.text[:MAX_LENGTH_RENDER_TITLE]
+
+    def save(self, *args, **kwargs):
+        """Сохранение с рендером текста в кэш."""
+        super().save(*args, **kwargs)
+        if 'text' not in self.get_deferred_fields():
+            store_text_html(self.text)
+
+    @property
+    def text_html(self):
+        """Текст комментария в HTML из кэша рендера."""
+        return text_html(self.text)
@@ -0,0 +1,217 @@
+import base64
+import binascii
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from blog.cache import tag_versions
+from blog.constants import (COUNT_CACHE_TIMEOUT, DB_INTEGER_RANGE,
+                            PAGE_WINDOW_ON_ENDS, PAGE_WINDOW_ON_EACH_SIDE)
+
+
+def encode_cursor(values):
+    """Упаковка значений ключа сортировки в непрозрачный токен."""
+    raw = json.dumps(
+        [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in values
+        ],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковка токена курсора в список значений."""
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404('Неверный курсор страницы.')
+    if not isinstance(values, list):
+        raise Http404('Неверный курсор страницы.')
+    return values
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с кэшированным числом объектов и окном номеров страниц.
+
+    Число объектов хранится под ключом `count_key` вместе с версиями
+    тегов `count_tags` (см. blog.cache) и пересчитывается, когда любой
+    из тегов сброшен. Без ключа работает как обычный Paginator.
+    """
+
+    def __init__(self, object_list, per_page, *args, count_key=None,
+                 count_tags=(), **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.count_key = count_key
+        self.count_tags = count_tags
+
+    @cached_property
+    def count(self):
+        """Число объектов из кэша или COUNT(*) с сохранением в кэш."""
+        if self.count_key is None:
+            return super().count
+        key = f'blog:count:{self.count_key}'
+        # версии берутся до подсчёта: сброс во время COUNT(*) не даст
+        # сохранить устаревшее значение под новыми версиями
+        versions = tag_versions(self.count_tags)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        count = super().count
+        cache.set(key, (versions, count), COUNT_CACHE_TIMEOUT)
+        return count
+
+    def page(self, number):
+        """Страница с ограниченным окном номеров для шаблона."""
+        page = super().page(number)
+        page.page_window = list(self.get_elided_page_range(
+            page.number,
+            on_each_side=PAGE_WINDOW_ON_EACH_SIDE,
+            on_ends=PAGE_WINDOW_ON_ENDS,
+        ))
+        return page
+
+
+class CursorPage:
+    """Страница курсорной (keyset) пагинации."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        """Есть ли следующая страница."""
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        """Есть ли предыдущая страница."""
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        """Есть ли другие страницы."""
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу сортировки без OFFSET и COUNT(*).
+
+    Каждая страница выбирается условием вида
+    ``(pub_date, id) < (:pub_date, :id)``, поэтому её стоимость
+    не зависит от того, насколько далеко ушёл читатель.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @property
+    def fields(self):
+        """Имена полей ключа сортировки без направления."""
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if len(values) != len(self.ordering):
+            raise Http404('Неверный курсор страницы.')
+        opts = self.queryset.model._meta
+        parsed = []
+        try:
+            for name, value in zip(self.fields, values):
+                value = opts.get_field(name).to_python(value)
+                # ключ сортировки не бывает NULL, а целые числа должны
+                # помещаться в 64-битную колонку БД
+                if value is None or (
+                    isinstance(value, int) and value not in DB_INTEGER_RANGE
+                ):
+                    raise ValidationError('Неверное значение курсора.')
+                parsed.append(value)
+        except (ValidationError, TypeError, ValueError):
+            raise Http404('Неверный курсор страницы.')
+        return parsed
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» в заданном направлении."""
+        condition = Q()
+        fields = self.fields
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith('-') == forward
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{fields[position]}__{lookup}': values[position]})
+            for prev_name, prev_value in zip(
+                fields[:position], values[:position]
+            ):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def cursor_for(self, item):
+        """Токен курсора, указывающий на объект."""
+        if isinstance(item, dict):
+            values = [item[name] for name in self.fields]
+        else:
+            values = [getattr(item, name) for name in self.fields]
+        return encode_cursor(values)
+
+    def page(self, after=None, before=None):
+        """Страница после курсора `after` или перед курсором `before`."""
+        if before:
+            queryset = self.queryset.filter(
+                self._seek(self._parse(before), forward=False)
+            ).order_by(*self._reversed_ordering())
+            items = list(queryset[:self.per_page + 1])
+            has_more = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            queryset = self.queryset
+            if after:
+                queryset = queryset.filter(
+                    self._seek(self._parse(after), forward=True)
+                )
+            items = list(
+                queryset.order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+            has_previous = bool(after)
+        return CursorPage(
+            items,
+            self,
+            next_cursor=(
+                self.cursor_for(items[-1]) if has_next and items else None
+            ),
+            previous_cursor=(
+                self.cursor_for(items[0]) if has_previous and items else None
+            ),
+        )
@@ -0,0 +1,85 @@
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from blog.models import FeedEntry, published_until
+from blog.signals import posts_became_visible
+
+BOUNDARY_KEY = 'blog:scheduler:boundary'
+
+
+def visible_from(pub_date):
+    """Момент, с которого пост с датой `pub_date` виден в лентах.
+
+    Пост публикуется с начала своего дня в TIME_ZONE (см.
+    published_until), а не в точное время pub_date.
+    """
+    day = timezone.localdate(pub_date)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class PublicationScheduler:
+    """Планировщик отложенных публикаций.
+
+    Ожидающие посты берутся из таблицы FeedEntry по индексу pub_date.
+    Граница публикации, обработанная последней, хранится в кэше; при
+    каждом запуске посты между ней и текущей границей объявляются
+    опубликованными сигналом posts_became_visible. Часы передаются
+    в конструктор, поэтому в тестах время подменяется без патчей.
+
+    Веб-процессы запускают планировщик сами (см. publish_due), поэтому
+    он работает и с локальным кэшем каждого воркера. Команда
+    run_scheduler полезна только с общим кэшем: тогда ленты сбрасываются
+    к началу дня, а не к первому запросу после него.
+    """
+
+    def __init__(self, clock=timezone.now):
+        self.clock = clock
+
+    def run_pending(self):
+        """Объявить опубликованными посты, чья дата наступила.
+
+        Возвращает id постов, ставших видимыми с прошлого запуска.
+        """
+        boundary = published_until(self.clock())
+        # без сохранённой границы (первый запуск, очистка кэша) сутки
+        # обрабатываются повторно: лишний сброс кэша безопаснее пропуска
+        previous = cache.get(BOUNDARY_KEY, boundary - timedelta(days=1))
+        post_ids = []
+        if previous < boundary:
+            post_ids = list(
+                FeedEntry.objects.filter(
+                    pub_date__gte=previous, pub_date__lt=boundary
+                ).values_list('post_id', flat=True)
+            )
+            if post_ids:
+                posts_became_visible.send(
+                    sender=self.__class__, post_ids=post_ids
+                )
+        cache.set(BOUNDARY_KEY, boundary, timeout=None)
+        return post_ids
+
+    def next_run_at(self):
+        """Момент следующей публикации или None, если ждать нечего."""
+        pub_date = (
+            FeedEntry.objects.filter(
+                pub_date__gte=published_until(self.clock())
+            )
+            .order_by('pub_date')
+            .values_list('pub_date', flat=True)
+            .first()
+        )
+        return pub_date and visible_from(pub_date)
+
+
+def publish_due(clock=timezone.now):
+    """Запуск планировщика, если граница публикации сдвинулась.
+
+    Вызывается на запросах к лентам: пока граница не изменилась, это
+    одно чтение из кэша, а при смене суток первый запрос процесса (или
+    любого процесса при общем кэше) объявляет посты опубликованными.
+    """
+    if cache.get(BOUNDARY_KEY) == published_until(clock()):
+        return []
+    return PublicationScheduler(clock).run_pending()
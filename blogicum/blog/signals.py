@@ -0,0 +1,299 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import Signal, receiver
+
+from blog.cache import (INDEX_TAG, category_tag, forget_miss,
+                        invalidate_tags, location_tag, post_tag, profile_tag,
+                        reference_tag)
+from blog.models import Category, Comment, FeedEntry, Location, Post, User
+
+# Посты с отложенной датой, ставшие видимыми (см. blog.scheduler);
+# аргумент post_ids — список id постов.
+posts_became_visible = Signal()
+
+# Посты, удаляемые в текущем потоке: их комментарии уходят каскадом,
+# и обновлять счётчик у удаляемой строки незачем.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@receiver(pre_delete, sender=Post)
+def mark_post_deleting(sender, instance, **kwargs):
+    """Запоминаем удаляемый пост до каскадного удаления комментариев."""
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unmark_post_deleting(sender, instance, **kwargs):
+    """Пост удалён, отметка больше не нужна."""
+    _deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw, **kwargs):
+    """Увеличение счётчика комментариев поста."""
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Уменьшение счётчика комментариев поста.
+
+    Срабатывает и при QuerySet.delete(), и при каскадном удалении:
+    пока подключён обработчик, Django удаляет комментарии по одному.
+    """
+    if instance.post_id in _deleting_posts():
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+# Таблица ленты
+@receiver(post_save, sender=Post)
+def sync_post_feed_entry(sender, instance, raw, **kwargs):
+    """Запись поста в ленте следует за его публикацией и категорией."""
+    if not raw:
+        FeedEntry.objects.sync_post(instance)
+
+
+@receiver(post_save, sender=Category)
+def sync_category_visibility(sender, instance, raw, created, **kwargs):
+    """Статус категории переносится в её посты и ленту.
+
+    Обновление идёт пачками после фиксации транзакции (например,
+    сохранения списка категорий в админке), чтобы каждая пачка
+    фиксировалась отдельно и не держала блокировку.
+    """
+    if raw or created:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if previous is None or previous[1] != instance.is_published:
+        transaction.on_commit(
+            partial(apply_category_visibility, instance.pk)
+        )
+
+
+def apply_category_visibility(category_id):
+    """Обновление постов категории и сброс зависящих от них страниц.
+
+    Возвращает число обновлённых постов.
+    """
+    updated = Post.objects.sync_category_published(category_id)
+    if updated:
+        category = Category.objects.filter(pk=category_id).first()
+        if category is not None:
+            invalidate_tags(*_category_pages_tags(category, authors=True))
+    return updated
+
+
+# Кэш промахов (404)
+@receiver(post_save, sender=Post)
+def forget_post_miss(sender, instance, created, **kwargs):
+    """Новый пост мог занять id, по которому раньше был 404."""
+    if created:
+        forget_miss('post', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def forget_category_miss(sender, instance, **kwargs):
+    """Slug категории появился (при создании или переименовании)."""
+    forget_miss('category', instance.slug)
+
+
+@receiver(post_save, sender=User)
+def forget_profile_miss(sender, instance, **kwargs):
+    """Имя пользователя появилось (при регистрации или смене)."""
+    forget_miss('profile', instance.username)
+
+
+# Инвалидация кэша страниц
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_reference_snapshot(sender, raw=False, **kwargs):
+    """Новая версия справочника: процессы перечитают таблицу."""
+    if not raw:
+        invalidate_tags(reference_tag(sender))
+
+
+def _post_pages_tags(post):
+    """Теги страниц, на которых выводится пост."""
+    tags = {post_tag(post.pk), INDEX_TAG, profile_tag(post.author.username)}
+    if post.category_id:
+        tags.add(category_tag(post.category.slug))
+    return tags
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_category(sender, instance, raw, **kwargs):
+    """Запоминаем прежнюю категорию: её страницы тоже устаревают."""
+    instance._previous_category_slug = None
+    if instance.pk and not raw:
+        instance._previous_category_slug = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('category__slug', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    """Сброс страниц поста, его категорий, автора и главной."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_category_slug', None)
+    invalidate_tags(
+        *_post_pages_tags(instance),
+        previous and category_tag(previous),
+    )
+
+
+@receiver(posts_became_visible)
+def invalidate_published_pages(sender, post_ids, **kwargs):
+    """Сброс лент, в которых появились отложенные посты."""
+    posts = FeedEntry.objects.filter(post_id__in=post_ids).values_list(
+        'post_id', 'category__slug', 'author__username'
+    )
+    tags = {INDEX_TAG}
+    for post_id, slug, username in posts:
+        tags.update(
+            (post_tag(post_id), category_tag(slug), profile_tag(username))
+        )
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    """Сброс страницы поста и лент, где выводится число комментариев."""
+    if raw or instance.post_id in _deleting_posts():
+        return
+    if Comment.post.is_cached(instance):
+        post = instance.post
+    else:
+        post = (
+            Post.objects.select_related('author', 'category')
+            .filter(pk=instance.post_id)
+            .first()
+        )
+    if post is not None:
+        invalidate_tags(*_post_pages_tags(post))
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_state(sender, instance, raw, **kwargs):
+    """Запоминаем прежние slug и статус публикации категории."""
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = (
+            Category.objects.filter(pk=instance.pk)
+            .values_list('slug', 'is_published')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_pages(sender, instance, raw=False, **kwargs):
+    """Сброс страниц категории, её постов, главной и профилей авторов."""
+    if raw:
+        return
+    previous_slug, was_published = (
+        getattr(instance, '_previous_state', None)
+        or (instance.slug, instance.is_published)
+    )
+    visibility_changed = (
+        was_published != instance.is_published
+        or kwargs.get('created')
+        or kwargs['signal'] is pre_delete
+    )
+    invalidate_tags(
+        category_tag(previous_slug),
+        *_category_pages_tags(instance, authors=visibility_changed),
+    )
+
+
+def _category_pages_tags(category, authors):
+    """Теги главной, страниц категории и, если нужно, профилей авторов."""
+    tags = {INDEX_TAG, category_tag(category.slug)}
+    if authors:
+        # посты категории появились в профилях авторов или пропали из них
+        usernames = (
+            Post.objects.filter(category_id=category.pk)
+            .values_list('author__username', flat=True)
+            .distinct()
+        )
+        tags.update(profile_tag(username) for username in usernames)
+    return tags
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw, update_fields=None, **kwargs):
+    """Запоминаем прежнее имя: страница по старому адресу устаревает."""
+    instance._previous_username = None
+    if (
+        instance.pk and not raw
+        and (update_fields is None or 'username' in update_fields)
+    ):
+        instance._previous_username = (
+            User.objects.filter(pk=instance.pk)
+            .values_list('username', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_pages(sender, instance, raw, **kwargs):
+    """Сброс профиля: имя, фамилия и прочие данные автора."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_username', None)
+    tags = {profile_tag(instance.username)}
+    if previous and previous != instance.username:
+        tags.add(profile_tag(previous))
+        tags.update(_authored_pages_tags(instance))
+    invalidate_tags(*tags)
+
+
+def _authored_pages_tags(user):
+    """Теги страниц, где выводятся имя пользователя и ссылка на профиль.
+
+    Это лента, страницы и категории его постов и страницы постов, которые
+    он комментировал.
+    """
+    tags = {INDEX_TAG}
+    for pk, slug in Post.objects.filter(author=user).values_list(
+        'pk', 'category__slug'
+    ):
+        tags.update((post_tag(pk), slug and category_tag(slug)))
+    tags.update(
+        post_tag(post_id)
+        for post_id in Comment.objects.filter(author=user)
+        .values_list('post_id', flat=True)
+        .distinct()
+    )
+    return tags
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_pages(sender, instance, raw=False, **kwargs):
+    """Сброс страниц, где выводится местоположение."""
+    if not raw:
+        invalidate_tags(location_tag(instance.pk))
@@ -1,12 +1,15 @@
 from django.urls import path
 
-from blog import views
+from blog import api, views
 
 app_name = 'blog'
 
 urlpatterns = [
     path('', views.IndexListView.as_view(), name='index'),
     # Адрес перехода на главную страницу
+    path('fragment/', views.IndexListView.as_view(fragment=True),
+         name='index_fragment'),
+    # Адрес фрагмента со следующими постами главной
     path('posts/create/', views.PostCreateView.as_view(),
          name='create_post'),
     # Адрес создания новых публикаций
@@ -22,17 +25,44 @@ urlpatterns = [
     path('category/<slug:category_slug>/', views.CategoryView.as_view(),
          name='category_posts'),
     # Адрес категории публикаций
+    path('category/<slug:category_slug>/fragment/',
+         views.CategoryView.as_view(fragment=True),
+         name='category_fragment'),
+    # Адрес фрагмента со следующими постами категории
     path('posts/<int:post_id>/comment/', views.CommentCreateView.as_view(),
          name='add_comment'),
     # Адрес создания комментария
+    path('posts/<int:post_id>/comments/', views.CommentListView.as_view(),
+         name='comments'),
+    # Адрес фрагмента со следующей страницей комментариев
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
          views.CommentUpdateView.as_view(), name='edit_comment'),
     # Адрес редактирования комментария
     path('posts/<int:post_id>/delete_comment/<int:comment_id>/',
          views.CommentDeleteView.as_view(), name='delete_comment'),
     # Адрес удаления комментария
+    path('locations/autocomplete/', views.LocationAutocompleteView.as_view(),
+         name='location_autocomplete'),
+    # Адрес автодополнения местоположений в форме поста
     path('profile/<str:username>/', views.Profile.as_view(), name='profile'),
     # Адрес профиля
+    path('profile/<str:username>/fragment/',
+         views.Profile.as_view(fragment=True), name='profile_fragment'),
+    # Адрес фрагмента со следующими постами профиля
+    path('api/posts/', api.IndexApiView.as_view(), name='api_posts'),
+    # API: лента опубликованных постов и выборка по ?ids=
+    path('api/posts/<int:post_id>/', api.PostApiView.as_view(),
+         name='api_post'),
+    # API: пост
+    path('api/posts/<int:post_id>/comments/',
+         api.CommentListApiView.as_view(), name='api_comments'),
+    # API: комментарии поста
+    path('api/category/<slug:category_slug>/posts/',
+         api.CategoryApiView.as_view(), name='api_category_posts'),
+    # API: лента категории
+    path('api/profile/<str:username>/posts/', api.ProfileApiView.as_view(),
+         name='api_profile_posts'),
+    # API: посты автора
     path('edit_profile/', views.EditProfile.as_view(), name='edit_profile'),
     # Адрес изменения профиля
 ]
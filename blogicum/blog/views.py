@@ -1,64 +1,144 @@
-from blog.constants import MAX_POSTS_PAGE
+from blog.constants import (COMMENTS_ORDERING, COMMENTS_PAGE_SIZE,
+                            MAX_POSTS_PAGE)
 from blog.forms import CommentForm, PostForm
-from blog.mixins import AuthorMixin, BaseMixin, CommentMixin, PostMixin
-from blog.models import Category, Post, User
+from blog.cache import (INDEX_TAG, category_tag, post_tag, profile_tag,
+                        rendered_posts_tags)
+from blog.mixins import (AuthorMixin, BaseMixin, CommentMixin,
+                         ConditionalGetMixin, CountCacheMixin,
+                         CursorPaginationMixin, FeedFragmentMixin,
+                         NegativeCacheMixin,
+                         PageCacheMixin, PostMixin,
+                         ScheduledPublicationMixin, StreamingMixin)
+from blog.models import Category, Comment, Location, Post, User
+from blog.paginators import CursorPaginator
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.utils import timezone
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)
+                                  UpdateView, View)
 from django.views.generic.edit import FormMixin
 
 
-class IndexListView(BaseMixin, ListView):
+class IndexListView(
+    ScheduledPublicationMixin, ConditionalGetMixin, PageCacheMixin,
+    FeedFragmentMixin, StreamingMixin, BaseMixin, ListView
+):
     """CBV вывода постов на главную страницу."""
 
     template_name = 'blog/index.html'
+    query_budget = 5
+    page_url_name = 'blog:index'
+    fragment_url_name = 'blog:index_fragment'
+
+    def get_validator_tags(self):
+        """Главная зависит от всех постов ленты."""
+        return {INDEX_TAG}
+
+    def get_count_cache_key(self):
+        """Число постов главной сбрасывается вместе с её страницами."""
+        return 'index', (INDEX_TAG,)
+
+    def get_page_cache_tags(self, response):
+        """Теги главной страницы."""
+        return {INDEX_TAG} | rendered_posts_tags(
+            response.context_data['page_obj']
+        )
 
 
-class PostDetailView(FormMixin, DetailView):
+class PostDetailView(
+    ScheduledPublicationMixin, NegativeCacheMixin, ConditionalGetMixin,
+    PageCacheMixin, StreamingMixin, FormMixin, DetailView
+):
     """CBV полной информации постов."""
 
     model = Post
     template_name = 'blog/detail.html'
     pk_url_kwarg = 'post_id'
+    # при потоковой отдаче комментарии читаются отдельно от их ключей
+    query_budget = 5
+    negative_cache_kind = 'post'
+    negative_cache_kwarg = 'post_id'
+    stream_items = 'comments'
+    stream_item_name = 'comment'
+    stream_item_template = 'includes/comment.html'
+
+    def object_exists(self):
+        """Пост есть, даже если скрыт от пользователя."""
+        return Post.objects.filter(pk=self.kwargs['post_id']).exists()
+
+    def get_object(self, queryset=None):
+        """Пост одним запросом с учётом видимости для пользователя."""
+        return get_object_or_404(
+            Post.objects.select_related('author', 'category', 'location')
+            .visible_to(self.request.user),
+            pk=self.kwargs[self.pk_url_kwarg],
+        )
 
-    def get_object(self):
-        """Функция для получения объекта post."""
-        post = super().get_object()
-        if post.author == self.request.user:
-            return post
+    def get_validator_tags(self):
+        """Пост и его комментарии."""
+        return {post_tag(self.kwargs[self.pk_url_kwarg])}
 
-        return get_object_or_404(
-            Post,
-            id=post.id,
-            is_published=True,
-            category__is_published=True,
-            pub_date__date__lte=timezone.now(),
+    def get_page_cache_tags(self, response):
+        """Теги страницы поста."""
+        return {post_tag(self.object.pk)} | rendered_posts_tags(
+            [self.object]
         )
 
     def get_context_data(self, **kwargs):
         """Фунция передачи данных контекста."""
+        comments = self.object.comments.select_related('author')
+        if self.use_streaming():
+            # страница по ключам, комментарии читаются после <head>
+            page = CursorPaginator(
+                Comment.objects.filter(post=self.object).only('created_at'),
+                COMMENTS_PAGE_SIZE,
+                ordering=COMMENTS_ORDERING,
+            ).page(after=self.request.GET.get('comments_after'))
+            comments = self.defer_page(page, comments, COMMENTS_ORDERING)
+        else:
+            comments = CursorPaginator(
+                comments, COMMENTS_PAGE_SIZE, ordering=COMMENTS_ORDERING,
+            ).page(after=self.request.GET.get('comments_after'))
         return super().get_context_data(
             **kwargs,
             form=CommentForm(),
-            comments=self.object.comments.select_related('author')
+            comments=comments
         )
 
 
-class CategoryView(BaseMixin, ListView):
+class CategoryView(
+    ScheduledPublicationMixin, NegativeCacheMixin, ConditionalGetMixin,
+    PageCacheMixin, FeedFragmentMixin, StreamingMixin, BaseMixin, ListView
+):
     """CBV страницы публикаций по категории."""
 
     template_name = 'blog/category.html'
     slug_url_kwarg = 'category_slug'
+    query_budget = 6
+    page_url_name = 'blog:category_posts'
+    fragment_url_name = 'blog:category_fragment'
+    negative_cache_kind = 'category'
+    negative_cache_kwarg = 'category_slug'
+
+    def object_exists(self):
+        """Категория есть, даже если снята с публикации.
+
+        Проверяется по БД: снимок справочника в этом процессе может ещё
+        не знать о только что созданной категории.
+        """
+        return Category.objects.filter(
+            slug=self.kwargs['category_slug']
+        ).exists()
 
     def get_object(self):
-        """Функция для получения объекта категории."""
-        return get_object_or_404(
-            Category, is_published=True, slug=self.kwargs[self.slug_url_kwarg]
+        """Опубликованная категория из снимка справочника."""
+        category = Category.objects.snapshot().by_slug.get(
+            self.kwargs[self.slug_url_kwarg]
         )
+        if category is None or not category.is_published:
+            raise Http404('Категория не найдена.')
+        return category
 
     def get_context_data(self, **kwargs):
         """Функция передачи данных контекста."""
@@ -66,16 +146,49 @@ class CategoryView(BaseMixin, ListView):
         context['category'] = self.get_object()
         return context
 
+    def get_validator_tags(self):
+        """Посты категории."""
+        return {category_tag(self.kwargs[self.slug_url_kwarg])}
+
+    def get_count_cache_key(self):
+        """Число постов категории."""
+        slug = self.kwargs[self.slug_url_kwarg]
+        return f'category:{slug}', (category_tag(slug),)
+
+    def get_page_cache_tags(self, response):
+        """Теги страницы категории."""
+        return {
+            category_tag(self.kwargs[self.slug_url_kwarg])
+        } | rendered_posts_tags(response.context_data['page_obj'])
+
     def get_queryset(self):
         """Дополнительно фильтруем посты по категории."""
         category = self.get_object()
         return super().get_queryset().filter(category=category)
 
 
+class LocationAutocompleteView(View):
+    """Поиск местоположений по началу названия для формы поста."""
+
+    query_budget = 3
+
+    def get(self, request):
+        """JSON со списком мест вида {"results": [{"id", "name"}]}."""
+        prefix = request.GET.get('q', '').strip()
+        results = []
+        if prefix:
+            results = list(
+                Location.objects.name_prefix(prefix).values('id', 'name')
+            )
+        return JsonResponse({'results': results})
+
+
 # Посты
 class PostCreateView(LoginRequiredMixin, PostMixin, CreateView):
     """CBV для добавления поста."""
 
+    query_budget = 5
+
     def form_valid(self, form):
         """Проверка валидности."""
         form.instance.author = self.request.user
@@ -93,6 +206,8 @@ class PostUpdateView(
 ):
     """CBV для редактирования поста."""
 
+    query_budget = 9
+
     def get_success_url(self):
         """Функция для переадресации пользователя."""
         return reverse(
@@ -105,6 +220,8 @@ class PostDeleteView(
 ):
     """CBV удаления публикации."""
 
+    query_budget = 7
+
     def get_context_data(self, **kwargs):
         """Фунция передачи данных контекста."""
         return super().get_context_data(
@@ -124,22 +241,54 @@ class CommentCreateView(
 ):
     """CBV добавления комментария."""
 
+    query_budget = 5
+
     def get_object(self):
         """Функция для получения объекта поста."""
-        self.post_obj = get_object_or_404(
-            Post,
-            id=self.kwargs[self.pk_url_kwarg]
-        )
+        if not hasattr(self, 'post_obj'):
+            self.post_obj = get_object_or_404(
+                Post.objects.select_related('author', 'category'),
+                id=self.kwargs[self.pk_url_kwarg]
+            )
         return self.post_obj
 
     def form_valid(self, form):
         """Проверка валидности."""
-        if form.is_valid():
-            form.instance.author = self.request.user
-            form.instance.post = self.get_object()
-            return super().form_valid(form)
-        else:
-            return super().form_invalid(form)
+        form.instance.author = self.request.user
+        form.instance.post = self.get_object()
+        return super().form_valid(form)
+
+
+class CommentListView(PageCacheMixin, CursorPaginationMixin, ListView):
+    """CBV фрагмента со следующей страницей комментариев поста."""
+
+    template_name = 'includes/comment_list.html'
+    paginate_by = COMMENTS_PAGE_SIZE
+    cursor_pagination = True
+    cursor_ordering = COMMENTS_ORDERING
+    query_budget = 4
+
+    def get_queryset(self):
+        """Комментарии поста, если пост виден пользователю."""
+        self.post_obj = get_object_or_404(
+            Post.objects.select_related('category')
+            .visible_to(self.request.user),
+            pk=self.kwargs['post_id'],
+        )
+        return self.post_obj.comments.select_related('author')
+
+    def get_context_data(self, **kwargs):
+        """Фунция передачи данных контекста."""
+        context = super().get_context_data(**kwargs)
+        context['post'] = self.post_obj
+        context['comments'] = context['page_obj']
+        return context
+
+    def get_page_cache_tags(self, response):
+        """Теги фрагмента: те же, что у страницы поста."""
+        return {post_tag(self.post_obj.pk)} | rendered_posts_tags(
+            [self.post_obj]
+        )
 
 
 class CommentUpdateView(
@@ -149,6 +298,7 @@ class CommentUpdateView(
 
     pk_url_kwarg = "comment_id"
     template_name = "blog/comment.html"
+    query_budget = 4
 
 
 class CommentDeleteView(
@@ -158,17 +308,37 @@ class CommentDeleteView(
 
     pk_url_kwarg = "comment_id"
     template_name = "blog/comment.html"
+    query_budget = 5
 
 
 # Профиль
-class Profile(ListView):
+class Profile(
+    ScheduledPublicationMixin, NegativeCacheMixin, ConditionalGetMixin,
+    PageCacheMixin, FeedFragmentMixin, StreamingMixin, CountCacheMixin,
+    CursorPaginationMixin, ListView
+):
     """CBV страницы пользователя."""
 
     template_name = 'blog/profile.html'
     paginate_by = MAX_POSTS_PAGE
+    query_budget = 5
+    page_url_name = 'blog:profile'
+    fragment_url_name = 'blog:profile_fragment'
+    negative_cache_kind = 'profile'
+    negative_cache_kwarg = 'username'
+
+    def object_exists(self):
+        """Автор найден; 404 тогда мог дать только номер страницы."""
+        return hasattr(self, 'author')
 
     def get_queryset(self):
-        """Метод queryset."""
+        """Метод queryset.
+
+        Остальные пользователи видят посты автора по тем же правилам,
+        что и ленты (PostQuerySet.published): пост виден с начала дня
+        своей публикации, а не с точного времени pub_date. Так профиль
+        согласован с главной, категорией, планировщиком и ETag.
+        """
         self.author = get_object_or_404(
             User,
             username=self.kwargs['username']
@@ -177,19 +347,26 @@ class Profile(ListView):
             return (
                 Post.objects.filter(author=self.author)
                 .select_related('author', 'category', 'location')
-                .annotate(comment_count=Count('comments'))
-                .order_by('-pub_date')
+                .defer('text')
+                .order_by('-pub_date', '-id')
             )
         return (
-            Post.objects.filter(
-                author=self.author,
-                is_published=True,
-                pub_date__lte=timezone.now()
-            )
-            .select_related('author')
-            .annotate(comment_count=Count('comments'))
-            .order_by('-pub_date')
+            Post.objects.published()
+            .filter(author=self.author)
+            .select_related('author', 'category', 'location')
+            .defer('text')
+            .order_by('-pub_date', '-id')
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """При потоковой отдаче страница выбирается по ключам постов."""
+        if not self.use_streaming():
+            return super().paginate_queryset(queryset, page_size)
+        paginator, page, _, is_paginated = super().paginate_queryset(
+            queryset.select_related(None).only('pub_date'), page_size
         )
+        self.defer_page(page, queryset, self.cursor_ordering)
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         """Фунция передачи данных контекста."""
@@ -197,12 +374,31 @@ class Profile(ListView):
         context['profile'] = self.author
         return context
 
+    def get_validator_tags(self):
+        """Данные и посты автора."""
+        return {profile_tag(self.kwargs['username'])}
+
+    def get_count_cache_key(self):
+        """Число постов автора: своё для автора и для остальных."""
+        audience = 'own' if self.request.user == self.author else 'public'
+        return (
+            f'profile:{self.author.username}:{audience}',
+            (profile_tag(self.author.username),),
+        )
+
+    def get_page_cache_tags(self, response):
+        """Теги страницы профиля."""
+        return {profile_tag(self.author.username)} | rendered_posts_tags(
+            response.context_data['page_obj']
+        )
+
 
 class EditProfile(LoginRequiredMixin, UpdateView):
     """CBV страницы изменения профиля пользователя."""
 
     model = User
     template_name = 'blog/user.html'
+    query_budget = 4
     fields = (
         'username',
         'first_name',
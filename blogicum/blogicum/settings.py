@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +69,22 @@ DATABASES = {
 }
 
 
+# Кэш фрагментов и страниц. Для нескольких воркеров нужен общий бэкенд
+# (memcached, redis): через него же расходится сброс тегов страниц.
+# С локальным кэшем отложенные посты публикует каждый воркер сам
+# (blog.scheduler.publish_due), команда run_scheduler ему не видна.
+# Промахи по несуществующим адресам с локальным кэшем живут не дольше
+# REFERENCE_SNAPSHOT_TTL (blog.cache.negative_cache_timeout).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -111,6 +128,11 @@ MEDIA_ROOT = BASE_DIR / 'media'
 EMAIL_BACKEND = 'django.core.mail.backends.<тип бэкенда>.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
+QUERY_BUDGET_RAISE = False
+
+# Потоковая отдача лент и страниц постов вошедшим пользователям
+STREAMING_PAGES = False
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'blog:index'
 
@@ -6,3 +6,8 @@ class PagesConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
+
+    def ready(self):
+        """Рендер страниц ошибок заранее, пока всё работает."""
+        from pages.views import prerender_error_pages
+        prerender_error_pages()
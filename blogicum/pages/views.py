@@ -1,6 +1,26 @@
+import logging
+
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.generic import TemplateView
 
+logger = logging.getLogger('pages.errors')
+
+ERROR_TEMPLATES = {
+    403: 'pages/403csrf.html',
+    404: 'pages/404.html',
+    500: 'pages/500.html',
+}
+# Последний рубеж: страница, для которой не нужен даже шаблонизатор.
+FALLBACK_PAGE = (
+    '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+    '<title>Ошибка {status}</title></head><body><h1>Ошибка {status}</h1>'
+    '<p><a href="/">Вернуться на главную</a></p></body></html>'
+)
+
+_prerendered = {}
+
 
 class AboutPage(TemplateView):
     """Клас страницы о проекте."""
@@ -14,16 +34,50 @@ class RulesPage(TemplateView):
     template_name = 'pages/rules.html'
 
 
+def prerender_error_pages():
+    """Рендер страниц ошибок в байты (вызывается при старте процесса).
+
+    Страницы рендерятся без запроса, как для анонимного гостя, поэтому
+    их выдача не трогает ни БД, ни сессию, ни шаблонизатор.
+    """
+    for status, template_name in ERROR_TEMPLATES.items():
+        try:
+            _prerendered[status] = render_to_string(template_name).encode()
+        except Exception:
+            logger.exception('Не удалось отрендерить %s', template_name)
+
+
+def error_page(status):
+    """Готовая страница ошибки или запасная без шаблона."""
+    content = _prerendered.get(status)
+    if content is None:
+        content = FALLBACK_PAGE.format(status=status).encode()
+    return HttpResponse(content, status=status)
+
+
+def cached_not_found():
+    """Ошибка 404 из готовых байтов."""
+    return error_page(404)
+
+
 def page_not_found(request, exception):
-    """Ошибка 404."""
-    return render(request, 'pages/404.html', status=404)
+    """Ошибка 404.
+
+    Страница рендерится с контекстом запроса (в шапке виден вошедший
+    пользователь); если рендер не удался, отдаётся готовая страница.
+    """
+    try:
+        return render(request, 'pages/404.html', status=404)
+    except Exception:
+        logger.exception('Не удалось отрендерить страницу 404')
+        return error_page(404)
 
 
 def csrf_failure(request, reason=''):
-    """Ошибка 403."""
-    return render(request, 'pages/403csrf.html', status=403)
+    """Ошибка 403: готовая страница pages/403csrf.html."""
+    return error_page(403)
 
 
 def internal_server_error(request):
-    """Ошибка 500."""
-    return render(request, 'pages/500.html', status=500)
+    """Ошибка 500: готовая страница pages/500.html без БД и шаблонов."""
+    return error_page(500)
@@ -0,0 +1,67 @@
+import re
+from typing import Callable, List, NamedTuple
+
+import pytest
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+
+BIG_TABLES = ("blog_post", "blog_comment", "blog_feedentry")
+
+PlannedQuery = NamedTuple(
+    "PlannedQuery", [("sql", str), ("plan", List[str])]
+)
+
+_FULL_SCAN = re.compile(
+    r"^SCAN (?:TABLE )?(?P<table>\w+)(?! USING (?:COVERING )?INDEX)"
+)
+
+
+def explain(sql: str, params) -> List[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_plan_steps(plan: List[str]) -> List[str]:
+    """Steps that mean a full scan of a big table or a sort in a temp
+    B-tree instead of reading rows in index order."""
+    bad = []
+    for step in plan:
+        match = _FULL_SCAN.match(step)
+        if match and match.group("table") in BIG_TABLES:
+            bad.append(step)
+        elif "USE TEMP B-TREE FOR ORDER BY" in step:
+            bad.append(step)
+    return bad
+
+
+def capture_planned_queries(
+        client: Client, method: str, url: str, data=None
+) -> List[PlannedQuery]:
+    """Runs a request and explains every SELECT it issued."""
+    with CaptureQueriesContext(connection) as ctx:
+        getattr(client, method)(url, data or {})
+    planned = []
+    for query in ctx.captured_queries:
+        sql = query["sql"]
+        if not sql.startswith("SELECT"):
+            continue
+        # captured SQL has parameters inlined, so it is explained as is
+        planned.append(PlannedQuery(sql, explain(sql, ())))
+    return planned
+
+
+@pytest.fixture
+def query_plans() -> Callable[..., List[PlannedQuery]]:
+    if connection.vendor != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN is SQLite-specific")
+    return capture_planned_queries
+
+
+@pytest.fixture
+def strict_query_budget(settings):
+    """Requests over their view's `query_budget` or with N+1 query
+    shapes raise `QueryBudgetExceeded` instead of logging a warning."""
+    settings.QUERY_BUDGET_RAISE = True
+    return settings
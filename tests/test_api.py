@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feed(mixer, user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            is_published=True, pub_date=now - timedelta(days=i + 1),
+        )
+        for i in range(15)
+    ]
+
+
+def _walk(client, url):
+    ids = []
+    while True:
+        data = client.get(url).json()
+        ids += [post['id'] for post in data['results']]
+        if data['next'] is None:
+            return ids
+        base = url.split('?')[0]
+        url = f'{base}?after={data["next"]}'
+
+
+def test_feeds_walk_published_posts(
+        strict_query_budget, client, feed, future_posts,
+        posts_with_unpublished_category,
+        unpublished_posts_with_published_locations
+):
+    expected = [post.id for post in feed]
+    post = feed[0]
+    for url in (
+        '/api/posts/',
+        f'/api/category/{post.category.slug}/posts/',
+        f'/api/profile/{post.author.username}/posts/',
+    ):
+        assert _walk(client, url) == expected, (
+            f'API `{url}` должно отдавать по курсору только'
+            ' опубликованные посты в порядке ленты.'
+        )
+
+
+def test_author_sees_own_hidden_posts(user_client, user, feed, future_posts):
+    ids = _walk(user_client, f'/api/profile/{user.username}/posts/')
+    assert {post.id for post in future_posts} <= set(ids)
+
+
+def test_sparse_fields(client, post_with_published_location):
+    post = post_with_published_location
+    data = client.get('/api/posts/?fields=id,title').json()
+    assert data['results'] == [{'id': post.id, 'title': post.title}]
+    detail = client.get(f'/api/posts/{post.id}/').json()
+    assert detail['text'] == post.text
+    assert detail['category']['slug'] == post.category.slug
+    assert detail['location'] == post.location.name
+    response = client.get('/api/posts/?fields=id,password')
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+def test_sparse_fields_select_only_their_columns(
+        client, post_with_published_location
+):
+    with CaptureQueriesContext(connection) as queries:
+        client.get('/api/posts/?fields=title')
+    post_sql = [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "blog_post"' in query['sql']
+    ]
+    assert len(post_sql) == 1
+    assert '"blog_post"."text"' not in post_sql[0]
+    assert '"blog_post"."excerpt"' not in post_sql[0]
+
+
+def test_api_does_not_load_location_table(
+        client, mixer, post_with_published_location
+):
+    unpublished = mixer.blend('blog.Location', is_published=False)
+    hidden = mixer.blend(
+        'blog.Post', location=unpublished, is_published=True,
+        category=post_with_published_location.category,
+        pub_date=post_with_published_location.pub_date,
+    )
+    with CaptureQueriesContext(connection) as queries:
+        data = client.get('/api/posts/?fields=id,location').json()
+    locations = {post['id']: post['location'] for post in data['results']}
+    assert locations == {
+        post_with_published_location.id:
+            post_with_published_location.location.name,
+        hidden.id: None,
+    }
+    assert not [
+        query for query in queries.captured_queries
+        if query['sql'].startswith('SELECT "blog_location"')
+    ], 'API не должно читать таблицу местоположений целиком.'
+
+
+def test_batch_lookup_respects_visibility(
+        client, user_client, feed, future_posts
+):
+    hidden = future_posts[0]
+    url = f'/api/posts/?ids={feed[2].id},{hidden.id},{feed[0].id},999999'
+    ids = [post['id'] for post in client.get(url).json()['results']]
+    assert ids == [feed[2].id, feed[0].id]
+    ids = [post['id'] for post in user_client.get(url).json()['results']]
+    assert ids == [feed[2].id, hidden.id, feed[0].id]
+    for ids in ('1,x', '99999999999999999999999', f'1,{-2 ** 63 - 1}'):
+        response = client.get(f'/api/posts/?ids={ids}')
+        assert response.status_code == 400, ids
+        assert 'error' in response.json()
+
+
+def test_post_and_comments_visibility(
+        mixer, client, user_client, future_posts
+):
+    post = future_posts[0]
+    mixer.cycle(3).blend('blog.Comment', post=post)
+    for url in (f'/api/posts/{post.id}/', f'/api/posts/{post.id}/comments/'):
+        assert client.get(url).status_code == 404
+        assert user_client.get(url).status_code == 200
+    data = user_client.get(
+        f'/api/posts/{post.id}/comments/?fields=id,author'
+    ).json()
+    assert len(data['results']) == 3
+    assert set(data['results'][0]) == {'id', 'author'}
+
+
+def test_api_answers_conditional_get(client, feed):
+    response = client.get('/api/posts/')
+    assert response.status_code == 200
+    repeated = client.get(
+        '/api/posts/', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert repeated.status_code == 304
@@ -0,0 +1,59 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def locations(mixer):
+    names = ('Москва', 'Мурманск', 'Минск', 'Омск', 'Магадан')
+    items = [
+        mixer.blend('blog.Location', name=name, is_published=True)
+        for name in names
+    ]
+    mixer.blend('blog.Location', name='Москва-Сити', is_published=False)
+    return items
+
+
+def test_location_autocomplete(client, locations):
+    response = client.get('/locations/autocomplete/', {'q': 'мос'})
+    assert response.status_code == 200
+    assert [item['name'] for item in response.json()['results']] == [
+        'Москва'
+    ]
+    response = client.get('/locations/autocomplete/', {'q': 'М'})
+    names = [item['name'] for item in response.json()['results']]
+    assert names == sorted(['Москва', 'Мурманск', 'Минск', 'Магадан'])
+    response = client.get('/locations/autocomplete/')
+    assert response.json() == {'results': []}
+
+
+def test_location_prefix_uses_index(query_plans, client, locations):
+    planned = query_plans(
+        client, 'get', '/locations/autocomplete/', {'q': 'Мо'}
+    )
+    plan = ' '.join(step for query in planned for step in query.plan)
+    assert 'location_name_idx' in plan
+
+
+def test_post_form_renders_only_selected_location(
+        user_client, locations, post_with_published_location
+):
+    post = post_with_published_location
+    content = user_client.get(f'/posts/{post.id}/edit/').content.decode()
+    start = content.index('<select name="location"')
+    select = content[start:content.index('</select>', start)]
+    assert 'data-autocomplete-url="/locations/autocomplete/"' in select
+    assert select.count('<option') == 2
+    assert f'value="{post.location.pk}" selected' in select
+
+
+def test_category_select_html_is_cached(user_client, published_category):
+    from blog.models import Category
+
+    user_client.get('/posts/create/')
+    rendered = Category.objects.snapshot().rendered
+    assert rendered
+    published_category.title = 'Другое название'
+    published_category.save()
+    content = user_client.get('/posts/create/').content.decode()
+    assert 'Другое название' in content
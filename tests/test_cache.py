@@ -0,0 +1,198 @@
+import pytest
+from django.template.loader import render_to_string
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _render_card(post):
+    from blog.models import Post
+
+    post = Post.objects.select_related(
+        'author', 'category', 'location'
+    ).get(pk=post.pk)
+    return render_to_string('includes/post_card.html', {'post': post})
+
+
+def test_post_card_fragment_is_cached(
+        django_assert_num_queries, post_with_published_location
+):
+    post = post_with_published_location
+    first = _render_card(post)
+    # только загрузка поста: шаблон карточки берётся из кэша
+    with django_assert_num_queries(1):
+        assert _render_card(post) == first
+
+
+@pytest.mark.parametrize('change', ['post', 'category', 'location', 'comment'])
+def test_post_card_fragment_follows_changes(
+        mixer, post_with_published_location, change
+):
+    post = post_with_published_location
+    before = _render_card(post)
+    if change == 'post':
+        post.is_published = False
+        post.save()
+        marker = 'Пост снят с публикации админом'
+    elif change == 'category':
+        post.category.title = 'Совсем новая категория'
+        post.category.save()
+        marker = 'Совсем новая категория'
+    elif change == 'location':
+        post.location.name = 'Совсем новое место'
+        post.location.save()
+        marker = 'Совсем новое место'
+    else:
+        mixer.blend('blog.Comment', post=post)
+        marker = 'Комментарии (1)'
+    assert marker not in before
+    assert marker in _render_card(post), (
+        'Убедитесь, что кэш карточки поста сбрасывается при изменении'
+        ' поста, его категории, местоположения и числа комментариев.'
+    )
+
+
+def _anonymous_get(client, url, django_assert_num_queries, queries):
+    with django_assert_num_queries(queries):
+        return client.get(url).content.decode('utf-8')
+
+
+def test_anonymous_pages_are_served_from_cache(
+        client, django_assert_num_queries, post_with_published_location
+):
+    post = post_with_published_location
+    for url in (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+        f'/posts/{post.id}/',
+    ):
+        first = client.get(url).content.decode('utf-8')
+        cached = _anonymous_get(client, url, django_assert_num_queries, 0)
+        assert cached == first, (
+            f'Убедитесь, что страница `{url}` для анонимного пользователя'
+            ' отдаётся из кэша.'
+        )
+
+
+def test_authenticated_users_bypass_page_cache(
+        client, user_client, post_with_published_location
+):
+    client.get('/')
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'Написать пост' in content
+
+
+@pytest.mark.parametrize('change', ['post', 'comment', 'category', 'location'])
+def test_page_cache_is_invalidated(
+        mixer, client, post_with_published_location, change,
+        django_capture_on_commit_callbacks
+):
+    post = post_with_published_location
+    urls = (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+        f'/posts/{post.id}/',
+    )
+    for url in urls:
+        client.get(url)
+    if change == 'post':
+        post.title = 'Заголовок после правки'
+        post.save()
+        marker, hidden = 'Заголовок после правки', False
+    elif change == 'comment':
+        mixer.blend('blog.Comment', post=post, text='Свежий комментарий')
+        marker, hidden = 'Комментарии (1)', False
+    elif change == 'category':
+        post.category.is_published = False
+        with django_capture_on_commit_callbacks(execute=True):
+            post.category.save()
+        marker, hidden = post.title, True
+    else:
+        post.location.name = 'Переименованное место'
+        post.location.save()
+        marker, hidden = 'Переименованное место', False
+    for url in urls:
+        response = client.get(url)
+        if change == 'comment' and url.startswith('/posts/'):
+            assert 'Свежий комментарий' in response.content.decode('utf-8')
+            continue
+        if hidden:
+            assert (
+                response.status_code == 404
+                or marker not in response.content.decode('utf-8')
+            ), f'Страница `{url}` не сброшена после снятия категории.'
+        else:
+            assert marker in response.content.decode('utf-8'), (
+                f'Убедитесь, что кэш страницы `{url}` сбрасывается при'
+                ' изменении поста, комментариев, категории и места.'
+            )
+
+
+def _count_queries(client, url):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    counts = [
+        query for query in ctx.captured_queries
+        if query['sql'].startswith('SELECT COUNT(*)')
+    ]
+    return response, counts
+
+
+def test_feed_count_is_cached_and_invalidated(
+        mixer, user_client, many_posts_with_published_locations
+):
+    posts = many_posts_with_published_locations
+    for url in (
+        '/',
+        f'/category/{posts[0].category.slug}/',
+        f'/profile/{posts[0].author.username}/',
+    ):
+        _, counts = _count_queries(user_client, url)
+        assert counts
+        response, counts = _count_queries(user_client, url)
+        assert not counts, (
+            f'Убедитесь, что число постов для `{url}` берётся из кэша.'
+        )
+        total = response.context['paginator'].count
+        mixer.blend(
+            'blog.Post', author=posts[0].author, category=posts[0].category
+        )
+        response, counts = _count_queries(user_client, url)
+        assert counts and response.context['paginator'].count == total + 1
+
+
+def test_username_change_purges_pages_showing_it(
+        mixer, client, another_user, post_with_published_location
+):
+    post = post_with_published_location
+    commented = mixer.blend(
+        'blog.Post', category=post.category, is_published=True,
+        pub_date=post.pub_date,
+    )
+    mixer.blend('blog.Comment', post=commented, author=another_user)
+    author, commenter = post.author, another_user
+    urls = (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/posts/{post.id}/',
+        f'/posts/{commented.id}/',
+    )
+    for url in urls:
+        client.get(url)
+    for user in (author, commenter):
+        user.username = f'{user.username}-renamed'
+        user.save()
+    for url in urls:
+        content = client.get(url).content.decode('utf-8')
+        names = (
+            (commenter,) if url == f'/posts/{commented.id}/' else (author,)
+        )
+        for user in names:
+            assert f'@{user.username}' in content, (
+                f'После смены имени пользователя страница `{url}` не должна'
+                ' отдаваться из кэша со старым именем.'
+            )
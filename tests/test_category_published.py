@@ -0,0 +1,113 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_copies_category_status_on_save(
+        mixer, published_category, post_with_published_location
+):
+    post = post_with_published_location
+    assert post.category_published
+    hidden = mixer.blend('blog.Category', is_published=False)
+    post.category = hidden
+    post.save(update_fields=['category'])
+    post.refresh_from_db()
+    assert not post.category_published
+    post.category = None
+    post.save()
+    assert not post.category_published
+
+
+def test_published_filter_does_not_join_category():
+    from blog.models import Post
+
+    assert 'blog_category' not in str(Post.objects.published().query)
+
+
+def test_category_toggle_updates_posts_in_chunks(
+        mixer, published_category, django_capture_on_commit_callbacks
+):
+    from blog.models import FeedEntry, Post
+
+    mixer.cycle(5).blend(
+        'blog.Post', category=published_category, is_published=True
+    )
+    published_category.is_published = False
+    with django_capture_on_commit_callbacks() as callbacks:
+        published_category.save()
+    assert Post.objects.published().count() == 5
+    assert len(callbacks) == 1
+    with CaptureQueriesContext(connection) as ctx:
+        updated = Post.objects.sync_category_published(
+            published_category.pk, chunk_size=2
+        )
+    assert updated == 5
+    updates = [
+        query for query in ctx.captured_queries
+        if query['sql'].startswith('UPDATE "blog_post"')
+    ]
+    assert len(updates) == 3
+    chunks = [
+        query['sql'] for query in ctx.captured_queries
+        if query['sql'].startswith('SELECT "blog_post"."id"')
+    ]
+    assert chunks and all('ORDER BY "blog_post"."id" ASC' in sql
+                          for sql in chunks)
+    if connection.vendor == 'sqlite':
+        from fixtures.queries import bad_plan_steps, explain
+
+        for sql in chunks:
+            assert not bad_plan_steps(explain(sql, ())), (
+                'Пачка постов категории должна читаться по индексу без'
+                ' сортировки всех её постов.'
+            )
+    assert not Post.objects.published().exists()
+    assert not FeedEntry.objects.exists()
+
+
+def test_post_reads_category_status_from_db(mixer, published_category):
+    from blog.forms import PostForm
+    from blog.models import Category, Post
+
+    # снимок категорий прогрет до снятия категории с публикации
+    # в другом процессе
+    PostForm().as_p()
+    Category.objects.filter(pk=published_category.pk).update(
+        is_published=False
+    )
+    form = PostForm({
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+    })
+    assert form.is_valid(), form.errors
+    form.instance.author = mixer.blend('auth.User')
+    post = form.save()
+    assert not Post.objects.get(pk=post.pk).category_published
+    assert not Post.objects.published().filter(pk=post.pk).exists()
+
+
+def test_sync_category_published_command(mixer, published_category):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from blog.models import FeedEntry, Post
+
+    hidden = mixer.blend('blog.Category', is_published=False)
+    posts = mixer.cycle(3).blend(
+        'blog.Post', category=hidden, is_published=True
+    )
+    # loaddata и raw-сохранения оставляют значение по умолчанию
+    Post.objects.update(category_published=True)
+    assert Post.objects.published().count() == 3
+    out = StringIO()
+    call_command('rebuild_feed', stdout=out)
+    assert 'Обновлено постов: 3' in out.getvalue()
+    assert not Post.objects.published().exists()
+    assert not FeedEntry.objects.filter(
+        post__in=[post.pk for post in posts]
+    ).exists()
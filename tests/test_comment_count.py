@@ -0,0 +1,46 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _count(post):
+    post.refresh_from_db(fields=['comment_count'])
+    return post.comment_count
+
+
+def test_comment_count_follows_create_and_delete(
+        mixer, post_with_published_location
+):
+    post = post_with_published_location
+    assert _count(post) == 0
+    comments = mixer.cycle(3).blend('blog.Comment', post=post)
+    assert _count(post) == 3
+    comments[0].delete()
+    assert _count(post) == 2
+    post.comments.all().delete()
+    assert _count(post) == 0
+
+
+def test_comment_count_after_bulk_create(
+        mixer, user, post_with_published_location
+):
+    from blog.models import Comment
+
+    post = post_with_published_location
+    Comment.objects.bulk_create(
+        Comment(post=post, author=user, text=str(i)) for i in range(4)
+    )
+    assert _count(post) == 4
+
+
+def test_recount_comments_command(mixer, post_with_published_location):
+    from blog.models import Post
+
+    post = post_with_published_location
+    mixer.cycle(2).blend('blog.Comment', post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+    call_command('recount_comments', stdout=StringIO())
+    assert _count(post) == 2
@@ -0,0 +1,113 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def page_urls(post_with_published_location):
+    post = post_with_published_location
+    return (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+        f'/posts/{post.id}/',
+    )
+
+
+def test_unchanged_pages_answer_304_without_db(
+        client, django_assert_num_queries, page_urls
+):
+    for url in page_urls:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('Last-Modified')
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, url
+
+
+def test_validators_change_with_content(
+        mixer, client, post_with_published_location, page_urls
+):
+    post = post_with_published_location
+    etags = {url: client.get(url)['ETag'] for url in page_urls}
+    mixer.blend('blog.Comment', post=post)
+    for url in page_urls:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 200, url
+        assert response['ETag'] != etags[url]
+
+
+def test_validators_differ_per_user(
+        user_client, another_user_client, post_with_published_location
+):
+    url = f'/posts/{post_with_published_location.id}/'
+    etag = user_client.get(url)['ETag']
+    assert another_user_client.get(url)['ETag'] != etag
+    response = another_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_profile_edit_changes_profile_validator(user, user_client):
+    url = f'/profile/{user.username}/'
+    etag = user_client.get(url)['ETag']
+    user_client.post('/edit_profile/', {
+        'username': user.username,
+        'first_name': 'Новое имя',
+        'last_name': '',
+        'email': 'new@example.com',
+    })
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Новое имя' in response.content.decode()
+
+
+def test_new_login_gets_fresh_page(user, user_client, page_urls):
+    for url in (*page_urls, '/api/posts/'):
+        etag = user_client.get(url)['ETag']
+        user_client.logout()
+        user_client.force_login(user)
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            f'После нового входа `{url}` не должна отдаваться из кэша'
+            ' браузера со старым CSRF-токеном.'
+        )
+
+
+def test_validators_change_at_day_boundary(monkeypatch, client, page_urls):
+    from datetime import timedelta
+
+    from blog import mixins
+    from blog.models import published_until
+
+    etags = {url: client.get(url)['ETag'] for url in page_urls}
+    tomorrow = published_until() + timedelta(days=1)
+    monkeypatch.setattr(mixins, 'published_until', lambda: tomorrow)
+    for url in page_urls:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code != 304, url
+
+
+@pytest.mark.parametrize('renamed', ('post author', 'commenter'))
+def test_validators_change_with_author_username(
+        mixer, client, post_with_published_location, renamed
+):
+    post = post_with_published_location
+    comment = mixer.blend('blog.Comment', post=post)
+    urls = [
+        f'/posts/{post.id}/',
+        f'/api/posts/{post.id}/comments/',
+    ]
+    if renamed == 'post author':
+        urls += ['/', f'/category/{post.category.slug}/']
+        user = post.author
+    else:
+        user = comment.author
+    etags = {url: client.get(url)['ETag'] for url in urls}
+    user.username = f'{user.username}-renamed'
+    user.save()
+    for url in urls:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 200, (
+            f'После смены имени автора `{url}` не должна отвечать 304.'
+        )
@@ -0,0 +1,50 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+LONG_TEXT = ' '.join(f'слово{i}' for i in range(30))
+
+
+def test_excerpt_follows_text(post_with_published_location):
+    from blog.models import Post
+
+    post = post_with_published_location
+    post.text = LONG_TEXT
+    post.save(update_fields=['text'])
+    post.refresh_from_db()
+    assert post.excerpt == Post.make_excerpt(LONG_TEXT)
+    assert post.excerpt.startswith('слово0 ')
+    assert post.excerpt.endswith(' …')
+
+
+def test_feeds_do_not_load_post_text(
+        another_user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for url in (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+    ):
+        with CaptureQueriesContext(connection) as ctx:
+            response = another_user_client.get(url)
+        assert post.excerpt in response.content.decode()
+        for query in ctx.captured_queries:
+            assert '"blog_post"."text"' not in query['sql'], (
+                f'Лента `{url}` не должна загружать полный текст постов.'
+            )
+
+
+def test_fill_excerpts_command(post_with_published_location):
+    from blog.models import Post
+
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(excerpt='', text=LONG_TEXT)
+    call_command('fill_excerpts', stdout=StringIO())
+    post.refresh_from_db()
+    assert post.excerpt == Post.make_excerpt(LONG_TEXT)
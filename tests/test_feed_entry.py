@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _feed_ids():
+    from blog.models import FeedEntry
+
+    return set(FeedEntry.objects.values_list('post_id', flat=True))
+
+
+def _visible_ids():
+    from blog.models import Post
+
+    return set(
+        Post.objects.filter(
+            is_published=True, category__is_published=True
+        ).values_list('id', flat=True)
+    )
+
+
+def test_feed_follows_post_changes(mixer, published_category):
+    from blog.models import FeedEntry
+
+    post = mixer.blend(
+        'blog.Post', category=published_category, is_published=True
+    )
+    assert _feed_ids() == {post.id}
+    post.pub_date = timezone.now() - timedelta(days=3)
+    post.save()
+    assert FeedEntry.objects.get().pub_date == post.pub_date
+    post.is_published = False
+    post.save()
+    assert _feed_ids() == set()
+    post.is_published = True
+    post.save()
+    post.delete()
+    assert _feed_ids() == set()
+
+
+def test_feed_follows_category_publication(
+        many_posts_with_published_locations, posts_with_unpublished_category,
+        django_capture_on_commit_callbacks
+):
+    category = many_posts_with_published_locations[0].category
+    assert _feed_ids() == _visible_ids()
+    category.is_published = False
+    with django_capture_on_commit_callbacks(execute=True):
+        category.save()
+    assert _feed_ids() == _visible_ids() == set()
+    category.is_published = True
+    with django_capture_on_commit_callbacks(execute=True):
+        category.save()
+    assert _feed_ids() == _visible_ids()
+    category.delete()
+    assert _feed_ids() == _visible_ids()
+
+
+def test_feed_hides_future_posts_until_pub_date(
+        unlogged_client, published_category, mixer
+):
+    from blog.models import FeedEntry
+
+    post = mixer.blend(
+        'blog.Post', category=published_category, is_published=True,
+        pub_date=timezone.now() + timedelta(days=2),
+    )
+    assert _feed_ids() == {post.id}
+    assert not FeedEntry.objects.published().exists()
+    response = unlogged_client.get('/')
+    assert post not in response.context['page_obj']
+
+
+def test_rebuild_feed_command(many_posts_with_published_locations):
+    from blog.models import FeedEntry, Post
+
+    FeedEntry.objects.all().delete()
+    Post.objects.update(is_published=True)
+    call_command('rebuild_feed', stdout=StringIO())
+    assert _feed_ids() == _visible_ids()
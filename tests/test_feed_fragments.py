@@ -0,0 +1,69 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+TITLE = re.compile(r'<h5 class="card-title">(.*?)</h5>')
+
+
+@pytest.fixture
+def many_posts(mixer, user, published_category):
+    now = timezone.now()
+    return [
+        mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            is_published=True, title=f'Пост {i}',
+            pub_date=now - timedelta(days=i + 1),
+        )
+        for i in range(25)
+    ]
+
+
+def _urls(post):
+    return (
+        ('/', '/fragment/'),
+        (f'/category/{post.category.slug}/',
+         f'/category/{post.category.slug}/fragment/'),
+        (f'/profile/{post.author.username}/',
+         f'/profile/{post.author.username}/fragment/'),
+    )
+
+
+def _next_url(content, attribute):
+    start = content.index(f'{attribute}="') + len(attribute) + 2
+    return content[start:content.index('"', start)]
+
+
+def test_page_links_first_fragment(client, many_posts):
+    for page_url, fragment_url in _urls(many_posts[0]):
+        content = client.get(page_url).content.decode()
+        assert _next_url(content, 'data-feed-fragment-url').startswith(
+            f'{fragment_url}?after='
+        ), f'Страница `{page_url}` должна ссылаться на фрагмент ленты.'
+
+
+def test_fragments_walk_whole_feed(client, many_posts):
+    expected = [post.title for post in many_posts]
+    for page_url, _ in _urls(many_posts[0]):
+        content = client.get(page_url).content.decode()
+        seen = TITLE.findall(content)
+        url = _next_url(content, 'data-feed-fragment-url')
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            fragment = response.content.decode()
+            assert '<html' not in fragment
+            assert f'href="{page_url}?after=' in fragment or (
+                'data-feed-fragment-url' not in fragment
+            )
+            seen += TITLE.findall(fragment)
+            url = (
+                _next_url(fragment, 'data-feed-fragment-url')
+                if 'data-feed-fragment-url' in fragment else None
+            )
+        assert seen == expected, (
+            f'Фрагменты ленты `{page_url}` должны по очереди отдать все посты.'
+        )
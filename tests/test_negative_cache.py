@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+MISSING_URLS = (
+    '/posts/999999/',
+    '/category/no-such-category/',
+    '/profile/no-such-user/',
+)
+
+
+@pytest.mark.parametrize('url', MISSING_URLS)
+def test_known_miss_is_served_without_db(
+        client, django_assert_num_queries, url
+):
+    assert client.get(url).status_code == 404
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.status_code == 404
+    assert response.content
+
+
+def test_hidden_post_is_not_cached_as_miss(
+        user_client, unlogged_client,
+        unpublished_posts_with_published_locations
+):
+    post = unpublished_posts_with_published_locations[0]
+    url = f'/posts/{post.id}/'
+    assert unlogged_client.get(url).status_code == 404
+    assert user_client.get(url).status_code == 200
+
+
+def test_miss_is_forgotten_on_create(client, mixer, published_category):
+    from django.contrib.auth import get_user_model
+
+    assert client.get('/category/fresh/').status_code == 404
+    assert client.get('/profile/newcomer/').status_code == 404
+    mixer.blend('blog.Category', slug='fresh', is_published=True)
+    mixer.blend(get_user_model(), username='newcomer')
+    assert client.get('/category/fresh/').status_code == 200
+    assert client.get('/profile/newcomer/').status_code == 200
+
+    assert client.get('/posts/424242/').status_code == 404
+    mixer.blend(
+        'blog.Post', id=424242, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    assert client.get('/posts/424242/').status_code == 200
+
+
+def test_stale_snapshot_does_not_cache_category_miss(client):
+    from blog.cache import is_known_miss
+    from blog.models import Category
+
+    assert client.get('/category/no-such-category/').status_code == 404
+    Category.objects.snapshot()
+    # bulk_create не шлёт сигналов: снимок справочника остаётся старым
+    Category.objects.bulk_create([
+        Category(
+            slug='silent', title='Тихая', description='-',
+            is_published=False,
+        ),
+    ])
+    assert client.get('/category/silent/').status_code == 404
+    assert not is_known_miss('category', 'silent'), (
+        'Промах категории нужно подтверждать по БД, а не по снимку.'
+    )
+
+
+def test_local_cache_caps_miss_timeout(settings):
+    from blog.cache import negative_cache_timeout
+    from blog.constants import NEGATIVE_CACHE_TIMEOUT, REFERENCE_SNAPSHOT_TTL
+
+    assert negative_cache_timeout() == min(
+        NEGATIVE_CACHE_TIMEOUT, REFERENCE_SNAPSHOT_TTL
+    )
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    }}
+    assert negative_cache_timeout() == NEGATIVE_CACHE_TIMEOUT
@@ -0,0 +1,137 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _walk_forward(client, url):
+    seen, token = [], ''
+    while token is not None:
+        response = client.get(url, {'after': token})
+        assert response.status_code == HTTPStatus.OK
+        page = response.context['page_obj']
+        assert len(page) <= N_PER_PAGE
+        seen.extend(page)
+        token = page.next_cursor
+    return seen
+
+
+@pytest.mark.parametrize('url_template', [
+    '/',
+    '/category/{category}/',
+    '/profile/{author}/',
+])
+def test_cursor_pagination_walks_whole_feed(
+        user_client, many_posts_with_published_locations, url_template
+):
+    posts = many_posts_with_published_locations
+    url = url_template.format(
+        category=posts[0].category.slug, author=posts[0].author.username
+    )
+    seen = _walk_forward(user_client, url)
+    expected = sorted(
+        posts, key=lambda post: (post.pub_date, post.id), reverse=True
+    )
+    assert [post.id for post in seen] == [post.id for post in expected], (
+        'Убедитесь, что курсорная пагинация по `?after=` проходит всю ленту'
+        ' от новых к старым без пропусков и повторов.'
+    )
+
+
+def test_cursor_pagination_goes_back(
+        user_client, many_posts_with_published_locations
+):
+    first = user_client.get('/', {'after': ''}).context['page_obj']
+    second = user_client.get(
+        '/', {'after': first.next_cursor}
+    ).context['page_obj']
+    assert second.has_previous()
+    back = user_client.get(
+        '/', {'before': second.previous_cursor}
+    ).context['page_obj']
+    assert [post.id for post in back] == [post.id for post in first]
+    assert not back.has_previous()
+
+
+def test_cursor_pagination_skips_count(
+        user_client, many_posts_with_published_locations
+):
+    first = user_client.get('/', {'after': ''}).context['page_obj']
+    with CaptureQueriesContext(connection) as queries:
+        user_client.get('/', {'after': first.next_cursor})
+    assert not any(
+        query['sql'].startswith('SELECT COUNT(*)')
+        for query in queries.captured_queries
+    ), 'В курсорном режиме пагинации не должен выполняться COUNT(*).'
+
+
+@pytest.mark.parametrize('values', [
+    None, [None, 1], [{}, 1], [True, 1], [1.5, [1]],
+    ['2020-01-01T00:00:00+00:00', 10 ** 30],
+])
+@pytest.mark.parametrize('url, param', [
+    ('/', 'after'), ('/', 'before'), ('/fragment/', 'after'),
+    ('/api/posts/', 'after'),
+])
+def test_cursor_pagination_rejects_garbage(user_client, url, param, values):
+    from blog.paginators import encode_cursor
+
+    token = 'not-a-cursor' if values is None else encode_cursor(values)
+    response = user_client.get(url, {param: token})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_comments_are_paginated_by_cursor(
+        mixer, user_client, post_with_published_location
+):
+    from blog.constants import COMMENTS_PAGE_SIZE
+
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_PAGE_SIZE + 5).blend(
+        'blog.Comment', post=post
+    )
+    response = user_client.get(f'/posts/{post.id}/')
+    first = response.context['comments']
+    assert len(first) == COMMENTS_PAGE_SIZE, (
+        'Убедитесь, что на странице поста выводится только первая страница'
+        ' комментариев.'
+    )
+    assert first.has_next()
+    fragment = user_client.get(
+        f'/posts/{post.id}/comments/', {'after': first.next_cursor}
+    )
+    assert fragment.status_code == HTTPStatus.OK
+    rest = fragment.context['comments']
+    assert [c.id for c in first] + [c.id for c in rest] == [
+        c.id for c in sorted(comments, key=lambda c: (c.created_at, c.id))
+    ]
+    assert not rest.has_next()
+    assert '<html' not in fragment.content.decode('utf-8')
+
+
+def test_comments_fragment_respects_post_visibility(
+        mixer, user_client, another_user_client,
+        unpublished_posts_with_published_locations
+):
+    post = unpublished_posts_with_published_locations[0]
+    mixer.blend('blog.Comment', post=post)
+    url = f'/posts/{post.id}/comments/'
+    assert user_client.get(url).status_code == HTTPStatus.OK
+    assert another_user_client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_page_window_is_bounded():
+    from blog.paginators import CachedCountPaginator
+
+    paginator = CachedCountPaginator(range(100_000), N_PER_PAGE)
+    page = paginator.page(5_000)
+    assert len(page.page_window) <= 11, (
+        'Убедитесь, что пагинатор выводит ограниченное окно номеров страниц.'
+    )
+    assert 5_000 in page.page_window
+    assert paginator.num_pages in page.page_window
@@ -0,0 +1,49 @@
+import pytest
+from django.http import HttpRequest
+from django.test.signals import template_rendered
+
+
+@pytest.fixture
+def rendered_templates():
+    templates = []
+
+    def receiver(sender, template, **kwargs):
+        templates.append(template.name)
+
+    template_rendered.connect(receiver)
+    yield templates
+    template_rendered.disconnect(receiver)
+
+
+@pytest.mark.parametrize('status, handler', [
+    (403, 'csrf_failure'),
+    (500, 'internal_server_error'),
+])
+def test_error_pages_are_prerendered(rendered_templates, status, handler):
+    from pages import views
+
+    response = getattr(views, handler)(HttpRequest())
+    assert response.status_code == status
+    assert response.content == views._prerendered[status]
+    assert rendered_templates == []
+
+
+def test_fallback_without_prerendered_page(monkeypatch):
+    from pages import views
+
+    monkeypatch.setattr(views, '_prerendered', {})
+    response = views.internal_server_error(HttpRequest())
+    assert response.status_code == 500
+    assert 'Ошибка 500' in response.content.decode()
+
+
+def test_not_found_falls_back_when_render_fails(monkeypatch):
+    from pages import views
+
+    def broken_render(*args, **kwargs):
+        raise RuntimeError('шаблонизатор недоступен')
+
+    monkeypatch.setattr(views, 'render', broken_render)
+    response = views.page_not_found(HttpRequest(), None)
+    assert response.status_code == 404
+    assert response.content == views._prerendered[404]
@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _captured_sql(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return [query['sql'] for query in queries.captured_queries]
+
+
+def test_published_filter_is_sargable(
+        another_user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for url in (
+        '/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{post.author.username}/',
+        f'/posts/{post.id}/',
+    ):
+        for sql in _captured_sql(another_user_client, url):
+            assert 'django_datetime_cast_date' not in sql, (
+                f'Фильтр по дате публикации на странице `{url}` не должен'
+                ' приводить pub_date к дате в каждой строке.'
+            )
+
+
+def test_published_keeps_end_of_day_semantics(mixer, published_category):
+    from blog.models import Post, published_until
+
+    boundary = published_until()
+    today = mixer.blend(
+        'blog.Post', category=published_category,
+        pub_date=boundary - timedelta(microseconds=1),
+    )
+    tomorrow = mixer.blend(
+        'blog.Post', category=published_category, pub_date=boundary,
+    )
+    published_ids = set(Post.objects.published().values_list('id', flat=True))
+    assert today.id in published_ids
+    assert tomorrow.id not in published_ids
+
+
+@pytest.mark.parametrize(
+    'client_name', ['user_client', 'another_user_client', 'unlogged_client']
+)
+def test_post_detail_loads_post_in_one_query(
+        request, client_name, post_with_published_location
+):
+    post = post_with_published_location
+    client = request.getfixturevalue(client_name)
+    post_queries = [
+        sql for sql in _captured_sql(client, f'/posts/{post.id}/')
+        if 'FROM "blog_post"' in sql
+    ]
+    assert len(post_queries) == 1, (
+        'Убедитесь, что страница поста загружает пост вместе с автором,'
+        ' категорией и местоположением одним запросом.'
+    )
+
+
+def test_post_detail_visibility(
+        user_client, another_user_client, unlogged_client,
+        unpublished_posts_with_published_locations, future_posts,
+        posts_with_unpublished_category
+):
+    hidden = (
+        unpublished_posts_with_published_locations[0],
+        future_posts[0],
+        posts_with_unpublished_category[0],
+    )
+    for post in hidden:
+        url = f'/posts/{post.id}/'
+        assert user_client.get(url).status_code == 200
+        assert another_user_client.get(url).status_code == 404
+        assert unlogged_client.get(url).status_code == 404
+    assert user_client.get('/posts/999999/').status_code == 404
+
+
+@pytest.fixture
+def edit_data(mixer, user, post_with_published_location):
+    post = post_with_published_location
+    comment = mixer.blend('blog.Comment', post=post, author=user)
+    mixer.cycle(3).blend('blog.Comment', post=post)
+    return post, comment
+
+
+@pytest.mark.parametrize('method, url_template, author_queries', [
+    ('get', '/posts/{post.id}/edit/', 5),
+    ('post', '/posts/{post.id}/edit/', 9),
+    ('get', '/posts/{post.id}/delete/', 3),
+    ('post', '/posts/{post.id}/delete/', 7),
+    ('post', '/posts/{post.id}/comment/', 5),
+    ('get', '/posts/{post.id}/edit_comment/{comment.id}/', 3),
+    ('post', '/posts/{post.id}/edit_comment/{comment.id}/', 4),
+    ('get', '/posts/{post.id}/delete_comment/{comment.id}/', 3),
+    ('post', '/posts/{post.id}/delete_comment/{comment.id}/', 5),
+])
+def test_edit_endpoints_fetch_target_once(
+        user_client, another_user_client, django_assert_num_queries,
+        edit_data, method, url_template, author_queries
+):
+    post, comment = edit_data
+    url = url_template.format(post=post, comment=comment)
+    data = {
+        'text': 'Новый текст',
+        'title': 'Новый заголовок',
+        'pub_date': '2020-01-01T10:00',
+        'category': post.category_id,
+    }
+    if url.endswith('/comment/'):
+        # комментировать может любой, не только автор
+        with django_assert_num_queries(author_queries):
+            getattr(another_user_client, method)(url, data)
+    else:
+        # чужой объект: сессия, пользователь, объект — и редирект
+        with django_assert_num_queries(3):
+            getattr(another_user_client, method)(url, data)
+    with django_assert_num_queries(author_queries):
+        getattr(user_client, method)(url, data)
+
+
+def test_profile_uses_feed_publication_day(
+        mixer, another_user_client, user, published_category
+):
+    from blog.models import published_until
+
+    boundary = published_until()
+    # последняя секунда сегодняшнего дня: ещё не наступила
+    later_today = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=boundary - timedelta(seconds=1),
+    )
+    tomorrow = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=boundary,
+    )
+    for url in ('/', f'/profile/{user.username}/'):
+        posts = list(another_user_client.get(url).context['page_obj'])
+        assert later_today in posts, (
+            f'На `{url}` пост виден с начала дня его публикации.'
+        )
+        assert tomorrow not in posts
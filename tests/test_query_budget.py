@@ -0,0 +1,80 @@
+import pytest
+from django.test import RequestFactory
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def budget_data(mixer, user, another_user, post_with_published_location):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    return post, comment
+
+
+@pytest.mark.parametrize(
+    "method, url_template",
+    [
+        ("get", "/"),
+        ("get", "/?page=2"),
+        ("get", "/?after="),
+        ("get", "/category/{post.category.slug}/"),
+        ("get", "/profile/{post.author.username}/"),
+        ("get", "/posts/{post.id}/"),
+        ("get", "/posts/create/"),
+        ("get", "/posts/{post.id}/edit/"),
+        ("get", "/posts/{post.id}/delete/"),
+        ("post", "/posts/{post.id}/comment/"),
+        ("get", "/posts/{post.id}/edit_comment/{comment.id}/"),
+        ("post", "/posts/{post.id}/edit_comment/{comment.id}/"),
+        ("get", "/posts/{post.id}/delete_comment/{comment.id}/"),
+        ("post", "/posts/{post.id}/delete_comment/{comment.id}/"),
+        ("post", "/posts/{post.id}/delete/"),
+        ("get", "/edit_profile/"),
+    ],
+)
+@pytest.mark.parametrize(
+    "client_name", ["user_client", "another_user_client", "unlogged_client"]
+)
+def test_views_stay_within_query_budget(
+        request, strict_query_budget, budget_data,
+        many_posts_with_published_locations, client_name, method,
+        url_template
+):
+    post, comment = budget_data
+    client = request.getfixturevalue(client_name)
+    url = url_template.format(post=post, comment=comment)
+    response = getattr(client, method)(url, {"text": "Комментарий"})
+    counter = response.wsgi_request.query_counter
+    budget = response.wsgi_request.query_budget
+    if budget is not None:
+        assert counter.total <= budget, (
+            f"Страница `{url}` выполняет {counter.total} запросов к БД"
+            f" при бюджете {budget}."
+        )
+
+
+def test_repeated_query_shape_is_reported(strict_query_budget):
+    from blog.middleware import (QueryBudgetExceeded, QueryBudgetMiddleware,
+                                 QueryCounter)
+
+    request = RequestFactory().get("/")
+    request.query_budget = None
+    request.query_counter = QueryCounter()
+    for _ in range(3):
+        request.query_counter.shapes[
+            'SELECT * FROM "auth_user" WHERE "id" = %s'
+        ] += 1
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        QueryBudgetMiddleware(lambda r: None).check(request)
+
+
+def test_budget_overrun_is_logged_by_default(caplog):
+    from blog.middleware import QueryBudgetMiddleware, QueryCounter
+
+    request = RequestFactory().get("/")
+    request.query_budget = 1
+    request.query_counter = QueryCounter()
+    request.query_counter.shapes["SELECT 1"] = 2
+    QueryBudgetMiddleware(lambda r: None).check(request)
+    assert "бюджете 1" in caplog.text
@@ -0,0 +1,58 @@
+from typing import Optional
+
+import pytest
+
+from fixtures.queries import bad_plan_steps
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def plan_data(mixer, user, another_user, post_with_published_location):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    return post, comment
+
+
+@pytest.mark.parametrize(
+    "method, url_template, expected_index",
+    [
+        ("get", "/", "feedentry_feed_idx"),
+        ("get", "/?after=", "feedentry_feed_idx"),
+        (
+            "get",
+            "/category/{post.category.slug}/",
+            "feedentry_category_feed_idx",
+        ),
+        ("get", "/profile/{post.author.username}/", "post_author_feed_idx"),
+        ("get", "/posts/{post.id}/", "comment_post_created_idx"),
+        ("get", "/posts/{post.id}/edit/", None),
+        ("get", "/posts/{post.id}/delete/", None),
+        ("post", "/posts/{post.id}/comment/", None),
+        ("get", "/posts/{post.id}/edit_comment/{comment.id}/", None),
+        ("get", "/posts/{post.id}/delete_comment/{comment.id}/", None),
+    ],
+)
+@pytest.mark.parametrize("client_name", ["user_client", "another_user_client"])
+def test_view_query_plans(
+        request, query_plans, plan_data, client_name, method: str,
+        url_template: str, expected_index: Optional[str]
+):
+    post, comment = plan_data
+    url = url_template.format(post=post, comment=comment)
+    client = request.getfixturevalue(client_name)
+    planned = query_plans(client, method, url, {"text": "Комментарий"})
+
+    for query in planned:
+        bad = bad_plan_steps(query.plan)
+        assert not bad, (
+            f"Запрос страницы `{url}` выполняется без подходящего индекса:"
+            f" {bad}\n{query.sql}"
+        )
+    if expected_index:
+        used = " ".join(step for query in planned for step in query.plan)
+        assert expected_index in used, (
+            f"Убедитесь, что для страницы `{url}` используется индекс"
+            f" `{expected_index}`."
+        )
@@ -0,0 +1,86 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _reference_queries(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "blog_category"' in query['sql'].split('JOIN')[0]
+        or 'FROM "blog_location"' in query['sql'].split('JOIN')[0]
+    ]
+
+
+def test_snapshot_is_reused_until_reference_changes(
+        django_assert_num_queries, published_category, published_location
+):
+    from blog.models import Category, Location
+
+    snapshot = Category.objects.snapshot()
+    assert snapshot.by_slug[published_category.slug] == published_category
+    with django_assert_num_queries(0):
+        assert Category.objects.snapshot() is snapshot
+    published_category.title = 'Новое название'
+    published_category.save()
+    fresh = Category.objects.snapshot()
+    assert fresh is not snapshot
+    assert fresh.get(published_category.pk).title == 'Новое название'
+    assert Location.objects.snapshot().get(published_location.pk)
+
+
+def test_snapshot_expires_without_shared_cache(
+        monkeypatch, published_category
+):
+    from blog import models
+    from blog.constants import REFERENCE_SNAPSHOT_TTL
+    from blog.models import Category
+
+    now = models.monotonic()
+    monkeypatch.setattr(models, 'monotonic', lambda: now)
+    snapshot = Category.objects.snapshot()
+    # изменение в другом процессе: сигнал до этого кэша не доходит
+    Category.objects.filter(pk=published_category.pk).update(
+        is_published=False
+    )
+    assert Category.objects.snapshot() is snapshot
+    monkeypatch.setattr(
+        models, 'monotonic', lambda: now + REFERENCE_SNAPSHOT_TTL
+    )
+    assert not Category.objects.snapshot().get(
+        published_category.pk
+    ).is_published
+
+
+def test_category_page_reads_category_from_snapshot(
+        user_client, post_with_published_location
+):
+    url = f'/category/{post_with_published_location.category.slug}/'
+    user_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        assert user_client.get(url).status_code == 200
+    assert not _reference_queries(queries)
+
+
+def test_post_form_uses_snapshot(published_category, published_location):
+    from blog.forms import PostForm
+
+    PostForm().as_p()
+    data = {
+        'title': 'Заголовок',
+        'text': 'Текст',
+        'pub_date': '2020-01-01T10:00',
+        'category': published_category.pk,
+        'location': published_location.pk,
+    }
+    with CaptureQueriesContext(connection) as queries:
+        form = PostForm(data)
+        form.as_p()
+        assert form.is_valid(), form.errors
+    # остаются только запросы по id выбранных строк, без перебора таблиц
+    for sql in _reference_queries(queries):
+        assert '"id" = ' in sql or '"id" IN ' in sql, sql
+    assert form.cleaned_data['category'] == published_category
+    data['category'] = 999999
+    assert 'category' in PostForm(data).errors
@@ -0,0 +1,99 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+class Clock:
+    """Часы для тестов: время меняется только вручную."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def future_post(mixer, published_category):
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    return mixer.blend(
+        'blog.Post', category=published_category, is_published=True,
+        pub_date=timezone.make_aware(datetime.combine(tomorrow, time(15))),
+    )
+
+
+def test_scheduler_publishes_at_start_of_pub_day(future_post):
+    from blog.scheduler import PublicationScheduler, visible_from
+
+    clock = Clock(timezone.now())
+    scheduler = PublicationScheduler(clock)
+    scheduler.run_pending()
+    visible_at = scheduler.next_run_at()
+    assert visible_at == visible_from(future_post.pub_date)
+    clock.now = visible_at - timedelta(seconds=1)
+    assert scheduler.run_pending() == []
+    clock.now = visible_at
+    assert scheduler.run_pending() == [future_post.id]
+    assert scheduler.run_pending() == []
+    assert scheduler.next_run_at() is None
+
+
+def test_published_post_invalidates_cached_feed(unlogged_client, future_post):
+    from blog.scheduler import PublicationScheduler, visible_from
+    from blog.signals import posts_became_visible
+
+    clock = Clock(timezone.now())
+    scheduler = PublicationScheduler(clock)
+    scheduler.run_pending()
+    response = unlogged_client.get('/')
+    assert future_post not in response.context['page_obj']
+    # повторный запрос отдаётся из кэша без рендера шаблона
+    assert unlogged_client.get('/').context is None
+    clock.now = visible_from(future_post.pub_date)
+    received = []
+
+    def receiver(sender, post_ids, **kwargs):
+        received.extend(post_ids)
+
+    posts_became_visible.connect(receiver)
+    try:
+        scheduler.run_pending()
+    finally:
+        posts_became_visible.disconnect(receiver)
+    assert received == [future_post.id]
+    # кэшированная страница главной больше не отдаётся
+    response = unlogged_client.get('/')
+    assert response.context is not None
+
+
+def test_run_scheduler_command_once(future_post):
+    out = StringIO()
+    call_command('run_scheduler', '--once', stdout=out)
+    assert 'Опубликовано' not in out.getvalue()
+
+
+def test_feed_request_publishes_due_posts(unlogged_client, future_post):
+    from blog.models import FeedEntry, Post, published_until
+    from blog.scheduler import BOUNDARY_KEY
+    from django.core.cache import cache
+
+    response = unlogged_client.get('/')
+    assert future_post not in response.context['page_obj']
+    # прошли сутки: дата поста наступила, а процесс ещё помнит
+    # вчерашнюю границу и закэшированную главную
+    boundary = published_until()
+    pub_date = boundary - timedelta(hours=1)
+    Post.objects.filter(pk=future_post.pk).update(pub_date=pub_date)
+    FeedEntry.objects.filter(post=future_post).update(pub_date=pub_date)
+    cache.set(BOUNDARY_KEY, boundary - timedelta(days=1), timeout=None)
+    response = unlogged_client.get('/')
+    assert response.context is not None, (
+        'Запрос к ленте должен сам запустить планировщик и сбросить'
+        ' кэш главной, даже если run_scheduler не запущен.'
+    )
+    assert future_post in response.context['page_obj']
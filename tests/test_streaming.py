@@ -0,0 +1,91 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def streaming(settings):
+    settings.STREAMING_PAGES = True
+    return settings
+
+
+def _chunks(response):
+    assert response.streaming
+    return [
+        chunk.decode('utf-8') for chunk in response.streaming_content
+    ]
+
+
+def test_feed_streams_head_before_cards(
+        streaming, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for url in ('/', f'/category/{post.category.slug}/',
+                f'/profile/{post.author.username}/'):
+        chunks = _chunks(user_client.get(url))
+        assert '<head>' in chunks[0]
+        assert 'stylesheet' in chunks[0]
+        assert post.title not in chunks[0]
+        assert any(post.title in chunk for chunk in chunks[1:-1])
+        assert '</html>' in chunks[-1]
+
+
+def test_detail_streams_comments(
+        streaming, mixer, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(3).blend('blog.Comment', post=post, text='Комментарий')
+    chunks = _chunks(user_client.get(f'/posts/{post.id}/'))
+    assert post.title in chunks[0]
+    assert len(chunks) == 5
+    assert all('Комментарий' in chunk for chunk in chunks[1:4])
+
+
+def test_anonymous_pages_are_not_streamed(
+        streaming, client, post_with_published_location
+):
+    response = client.get('/')
+    assert not response.streaming
+    assert post_with_published_location.title in response.content.decode()
+
+
+def test_items_are_read_after_head(
+        streaming, mixer, user_client, post_with_published_location
+):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    post = post_with_published_location
+    mixer.cycle(3).blend('blog.Comment', post=post, text='Комментарий')
+    for url, item_column in (
+        ('/', '"blog_post"."title"'),
+        (f'/category/{post.category.slug}/', '"blog_post"."title"'),
+        (f'/profile/{post.author.username}/', '"blog_post"."title"'),
+        (f'/posts/{post.id}/', '"blog_comment"."text"'),
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = iter(user_client.get(url).streaming_content)
+            head = next(chunks).decode()
+            before = len(queries.captured_queries)
+            list(chunks)
+        item_queries = [
+            index for index, query in enumerate(queries.captured_queries)
+            if item_column in query['sql']
+        ]
+        assert '<head>' in head
+        assert item_queries and min(item_queries) >= before, (
+            f'Объекты страницы `{url}` должны читаться после отправки <head>.'
+        )
+
+
+def test_streamed_queries_count_against_budget(
+        streaming, strict_query_budget, monkeypatch, user_client,
+        post_with_published_location
+):
+    from blog.middleware import QueryBudgetExceeded
+    from blog.views import IndexListView
+
+    monkeypatch.setattr(IndexListView, 'query_budget', 3)
+    response = user_client.get('/')
+    with pytest.raises(QueryBudgetExceeded):
+        list(response.streaming_content)
@@ -0,0 +1,52 @@
+import pytest
+from django.core.cache import cache
+
+pytestmark = [pytest.mark.django_db]
+
+RAW_TEXT = 'Первая <b>строка</b>\r\nвторая & третья'
+HTML_TEXT = 'Первая &lt;b&gt;строка&lt;/b&gt;<br>вторая &amp; третья'
+
+
+def _cached_html(text):
+    from blog.cache import _text_html_key
+
+    return cache.get(_text_html_key(text))
+
+
+def test_post_text_rendered_on_save(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    post.text = RAW_TEXT
+    post.save(update_fields=['text'])
+    assert _cached_html(RAW_TEXT) == HTML_TEXT
+    content = user_client.get(f'/posts/{post.id}/').content.decode()
+    assert HTML_TEXT in content
+
+
+def test_comment_text_rendered_on_save(
+        user, user_client, post_with_published_location
+):
+    from blog.models import Comment
+
+    post = post_with_published_location
+    user_client.post(f'/posts/{post.id}/comment/', {'text': RAW_TEXT})
+    assert _cached_html(RAW_TEXT) == HTML_TEXT
+    cache.clear()
+    Comment.objects.bulk_create(
+        [Comment(post=post, author=user, text=RAW_TEXT)]
+    )
+    assert _cached_html(RAW_TEXT) == HTML_TEXT
+    content = user_client.get(f'/posts/{post.id}/').content.decode()
+    assert content.count(HTML_TEXT) == 2
+
+
+def test_text_html_rendered_on_cache_miss(post_with_published_location):
+    from blog.models import Post
+
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(text=RAW_TEXT)
+    post.refresh_from_db()
+    assert _cached_html(RAW_TEXT) is None
+    assert post.text_html == HTML_TEXT
+    assert _cached_html(RAW_TEXT) == HTML_TEXT